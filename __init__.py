@@ -14,6 +14,8 @@ import traceback
 # Lista de nombres de módulos que usa tu menú (añade/quita si hace falta)
 # -------------------------------------------------------------------
 module_names = [
+    # caché de contención (handlers de depsgraph)
+    "containment",
     "import_fbx_to_collections",
     "rename_plates",
     "apply_fullbuilding_sys",
@@ -24,17 +26,22 @@ module_names = [
     "clean_setdressing_collections",
     "clean_building_collections",
     "export_fbx",
+    # cola modal de exportación
+    "export_queue",
     "clean_figma_curves",
     "export_buildings_fbx",
     "generate_csv_report",
+    # librería de node groups (preferencias + caché)
+    "node_library",
     # geometry nodes module (varios operadores dentro)
     "load_geometry_nodes",
     # orden / UI list
     "object_order_tools",
     # procesar mallas
     "procesar_mallas",
-    # actualizar FBX externo
+    # actualizar FBX externo (+ procesos en segundo plano)
     "actualizar_coleccion_externa",
+    "sync_queue",
     # renamer tool
     "renamer_tool",
     # paneles
@@ -54,11 +61,11 @@ for name in module_names:
 # -------------------------------------------------------------------
 # Colección dinámica de clases a registrar
 # - Buscamos en cada módulo clases que sean subclass de tipos Blender:
-#   Operator, Panel, PropertyGroup, UIList
+#   Operator, Panel, PropertyGroup, UIList, AddonPreferences
 # -------------------------------------------------------------------
 classes = []
 
-_bl_types = (bpy.types.Operator, bpy.types.Panel, bpy.types.PropertyGroup, bpy.types.UIList)
+_bl_types = (bpy.types.Operator, bpy.types.Panel, bpy.types.PropertyGroup, bpy.types.UIList, bpy.types.AddonPreferences)
 
 for mod_name, mod in modules.items():
     for attr_name in dir(mod):
@@ -85,6 +92,26 @@ def register_properties():
             name="Export Folder", description="Selecciona la carpeta para exportar los archivos FBX", subtype='DIR_PATH'
         )
 
+    if not hasattr(bpy.types.Scene, "export_force"):
+        bpy.types.Scene.export_force = bpy.props.BoolProperty(
+            name="Forzar exportación",
+            description="Exporta todas las colecciones aunque su contenido no haya cambiado desde la última exportación",
+            default=False
+        )
+
+    if not hasattr(bpy.types.Scene, "export_parallel"):
+        bpy.types.Scene.export_parallel = bpy.props.BoolProperty(
+            name="Exportación paralela",
+            description="Exporta cada colección en procesos Blender en segundo plano a partir de un snapshot",
+            default=False
+        )
+
+    if not hasattr(bpy.types.Scene, "export_workers"):
+        bpy.types.Scene.export_workers = bpy.props.IntProperty(
+            name="Procesos", description="Número de procesos de exportación (0 = núcleos del equipo)",
+            default=0, min=0
+        )
+
     if not hasattr(bpy.types.Scene, "create_road_help"):
         bpy.types.Scene.create_road_help = bpy.props.BoolProperty(
             name="Road", description="Generar malla RoadHelp", default=True
@@ -172,7 +199,7 @@ def register_properties():
 def unregister_properties():
     # Base properties
     base_props = [
-        "export_folder", "create_road_help", "split_collection", "entrances_collection",
+        "export_folder", "export_force", "export_parallel", "export_workers", "create_road_help", "split_collection", "entrances_collection",
         "export_csv_path", "my_objects", "my_objects_index", "procesar_coleccion_props",
         "actualizar_fbx_props", "apply_activecollection_make_data_single"
     ]
@@ -195,7 +222,16 @@ def unregister_properties():
 # -------------------------------------------------------------------
 # Registro principal
 # -------------------------------------------------------------------
+# Módulos con handlers de bpy.app.handlers (register_handlers / unregister_handlers)
+_handler_modules = ["containment", "sync_queue"]
+
+
 def register():
+    # handlers de las cachés (módulos auxiliares, sin clases)
+    for name in _handler_modules:
+        if name in modules:
+            modules[name].register_handlers()
+
     # registrar clases en el orden encontrado
     for cls in classes:
         try:
@@ -213,6 +249,10 @@ def register():
 def unregister():
     unregister_properties()
 
+    for name in reversed(_handler_modules):
+        if name in modules:
+            modules[name].unregister_handlers()
+
     for cls in reversed(classes):
         try:
             bpy.utils.unregister_class(cls)
@@ -1,11 +1,21 @@
 import bpy
+import json
 import os
+import re
 import subprocess
 import tempfile
 import shutil
+from fnmatch import fnmatchcase
 
 from bpy.types import Operator, PropertyGroup
-from bpy.props import StringProperty
+from bpy.props import BoolProperty, EnumProperty, StringProperty
+
+from .sync_ledger import is_unchanged, read_ledger_from_file, source_mtime
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Script del modo directo (un solo Blender en segundo plano)
+SYNC_APPEND_SCRIPT = os.path.join(ADDON_DIR, "sync_append_worker.py")
 
 
 # ---------------------------------------------------------------------------
@@ -18,112 +28,163 @@ class ActualizarFBXProps(PropertyGroup):
         subtype='FILE_PATH'
     )
     nombre_coleccion: StringProperty(
-        name="Nombre de la colección"
+        name="Colecciones",
+        description="Nombre de la colección, varios separados por comas o patrones como BR_*"
+    )
+    modo: EnumProperty(
+        name="Modo",
+        items=[
+            ('APPEND', "Directo", "Anexa la colección desde el .blend fuente en un solo proceso (sin pérdidas)"),
+            ('FBX', "FBX", "Exporta la colección a un FBX temporal y lo importa en el destino"),
+        ],
+        default='APPEND'
+    )
+    forzar: BoolProperty(
+        name="Forzar",
+        description="Sincronizar aunque el registro del destino indique que no hay cambios",
+        default=False
     )
 
 
 # ---------------------------------------------------------------------------
-# OPERADOR PRINCIPAL
+# RUTAS
 # ---------------------------------------------------------------------------
 
-class OBJECT_OT_actualizar_coleccion_externa(Operator):
-    bl_idname = "object.actualizar_coleccion_externa"
-    bl_label = "Actualizar colección externa"
-    bl_description = "Exporta desde el archivo fuente y actualiza la colección en el archivo Blocking correspondiente"
-
-    @classmethod
-    def poll(cls, context):
-        return True
-
-    def execute(self, context):
-
-        props = context.scene.actualizar_fbx_props
-        ruta_blend = bpy.path.abspath(props.ruta_blend)
-        coleccion_nombre = props.nombre_coleccion
-
-        # -------------------------------------------------------------------
-        # VALIDACIÓN DEL ARCHIVO FUENTE
-        # -------------------------------------------------------------------
-        if not os.path.exists(ruta_blend):
-            self.report({'ERROR'}, "Archivo fuente (.blend) no encontrado.")
-            return {'CANCELLED'}
-        
-        # -------------------------------------------------------------------
-        # DIRECTORIO TEMPORAL Y RUTAS
-        # -------------------------------------------------------------------
-        temp_dir = tempfile.mkdtemp()
-        fbx_path = os.path.join(temp_dir, "temp_export.fbx")
-        blender_path = bpy.app.binary_path
-
-        # -------------------------------------------------------------------
-        # ARCHIVO ACTUAL (EL CUTTER)
-        # -------------------------------------------------------------------
-        archivo_actual = bpy.path.abspath(bpy.data.filepath)
-        nombre_archivo = os.path.basename(archivo_actual)
-        carpeta_actual = os.path.dirname(archivo_actual)
+def nombres_coleccion(texto):
+    """'A, B; BR_*' → ['A', 'B', 'BR_*'] (los patrones se resuelven contra el archivo fuente)."""
+    return [nombre.strip() for nombre in re.split(r"[,;]", texto) if nombre.strip()]
 
-        if "_Cutter.blend" not in nombre_archivo:
-            self.report({'ERROR'}, "El archivo actual no termina en '_Cutter.blend'.")
-            return {'CANCELLED'}
 
-        # -------------------------------------------------------------------
-        # CREAR EL ARCHIVO DESTINO AUTOMÁTICAMENTE
-        # -------------------------------------------------------------------
+def resolver_destino(archivo_actual):
+    """
+    Deduce el archivo Blocking a partir del Cutter abierto.
+    Devuelve (target_blend, None) o (None, mensaje de error).
+    """
+    nombre_archivo = os.path.basename(archivo_actual)
+    carpeta_actual = os.path.dirname(archivo_actual)
 
-        # 1. Nombre del archivo destino
-        nombre_destino = nombre_archivo.replace("_Cutter.blend", "_Blocking_FBX.blend")
+    if "_Cutter.blend" not in nombre_archivo:
+        return None, "El archivo actual no termina en '_Cutter.blend'."
 
-        # 2. Carpeta destino (reemplazar Cutter → Blocking)
-        if "Cutter" not in carpeta_actual:
-            self.report({'ERROR'}, "La carpeta actual no contiene 'Cutter', no se puede deducir la ruta destino.")
-            return {'CANCELLED'}
+    # 1. Nombre del archivo destino
+    nombre_destino = nombre_archivo.replace("_Cutter.blend", "_Blocking_FBX.blend")
 
-        carpeta_destino = carpeta_actual.replace("Cutter", "Blocking")
+    # 2. Carpeta destino (reemplazar Cutter → Blocking)
+    if "Cutter" not in carpeta_actual:
+        return None, "La carpeta actual no contiene 'Cutter', no se puede deducir la ruta destino."
 
-        # 3. Ruta final
-        target_blend = os.path.join(carpeta_destino, nombre_destino)
+    carpeta_destino = carpeta_actual.replace("Cutter", "Blocking")
 
-        if not os.path.exists(target_blend):
-            # Crear carpetas si no existen
-            os.makedirs(carpeta_destino, exist_ok=True)
+    # 3. Ruta final
+    return os.path.join(carpeta_destino, nombre_destino), None
 
-            # Crear archivo .blend vacío
-            subprocess.run([
-                blender_path,
-                "--background",
-                "--factory-startup",
-                "--python-expr",
-                f"import bpy; bpy.ops.wm.save_mainfile(filepath=r'{target_blend}')"
-            ])
 
+def resolver_en_fuente(ruta_blend, patrones):
+    """Nombres de colecciones de la fuente que coinciden con los patrones (sin cargar datos)."""
+    with bpy.data.libraries.load(ruta_blend, link=False) as (data_from, _data_to):
+        nombres_fuente = list(data_from.collections)
+    return [n for n in nombres_fuente if any(fnmatchcase(n, p) for p in patrones)]
 
 
+def pendientes_segun_registro(ruta_blend, nombres, target_blend):
+    """Colecciones cuyo archivo fuente cambió desde la última sincronización (en milisegundos)."""
+    ledger = read_ledger_from_file(target_blend)
+    mtime = source_mtime(ruta_blend)
+    return [n for n in nombres if not is_unchanged(ledger, n, ruta_blend, mtime)]
 
-        # -------------------------------------------------------------------
-        # SCRIPT: EXPORTAR FBX DESDE EL ARCHIVO FUENTE
-        # -------------------------------------------------------------------
 
-        export_script = os.path.join(temp_dir, "export_script.py")
-        with open(export_script, "w") as f:
-            f.write(f"""
+# ---------------------------------------------------------------------------
+# ETAPAS (una por proceso de Blender)
+# ---------------------------------------------------------------------------
+# Cada etapa es (nombre, comando). --python-exit-code hace que un error en
+# el script se refleje en el código de salida del proceso.
+
+def etapas_append(blender_path, ruta_blend, colecciones, target_blend, forzar=False):
+    """Modo directo: un único proceso anexa todas las colecciones y guarda el destino una vez."""
+    cmd = [blender_path, "--background", "--factory-startup"]
+    if os.path.exists(target_blend):
+        cmd.append(target_blend)
+    cmd += [
+        "--python-exit-code", "1",
+        "--python", SYNC_APPEND_SCRIPT,
+        "--",
+        "--source", ruta_blend,
+        "--target", target_blend,
+    ]
+    for nombre in colecciones:
+        cmd += ["--collection", nombre]
+    if forzar:
+        cmd.append("--force")
+    return [("Sincronizar", cmd)]
+
+
+def etapas_fbx(blender_path, ruta_blend, colecciones, target_blend, temp_dir):
+    """
+    Modo FBX: crear el destino si falta, exportar todas las colecciones desde
+    la fuente (un proceso) e importarlas en el destino (otro proceso, un solo guardado).
+    """
+    # Parámetros por JSON: los nombres no se incrustan en el código generado
+    params_path = os.path.join(temp_dir, "params.json")
+    exportadas_path = os.path.join(temp_dir, "exportadas.json")
+    with open(params_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "patrones": colecciones,
+            "fbx_dir": temp_dir,
+            "exportadas": exportadas_path,
+            "fuente": ruta_blend,
+            "addon_dir": ADDON_DIR,
+        }, f)
+
+    etapas = []
+
+    if not os.path.exists(target_blend):
+        # Crear archivo .blend vacío
+        etapas.append(("Crear destino", [
+            blender_path,
+            "--background",
+            "--factory-startup",
+            "--python-expr",
+            f"import bpy; bpy.ops.wm.save_mainfile(filepath=r'{target_blend}')"
+        ]))
+
+    # -------------------------------------------------------------------
+    # SCRIPT: EXPORTAR FBX DESDE EL ARCHIVO FUENTE
+    # -------------------------------------------------------------------
+
+    export_script = os.path.join(temp_dir, "export_script.py")
+    with open(export_script, "w") as f:
+        f.write(f"""
 import bpy
+import json
+import os
 import sys
+from fnmatch import fnmatchcase
 
-coleccion = bpy.data.collections.get('{coleccion_nombre}')
-if not coleccion:
-    print('ERROR: colección no encontrada')
-    sys.exit(1)
+with open(r'{params_path}', encoding='utf-8') as f:
+    params = json.load(f)
+
+patrones = params['patrones']
+colecciones = [c for c in bpy.data.collections if any(fnmatchcase(c.name, p) for p in patrones)]
+for p in patrones:
+    if not any(fnmatchcase(c.name, p) for c in bpy.data.collections):
+        print(f"AVISO: '{{p}}' no coincide con ninguna colección")
 
-for obj in bpy.data.objects:
-    obj.select_set(False)
+exportadas = []
+for i, coleccion in enumerate(colecciones):
+    for obj in bpy.data.objects:
+        obj.select_set(False)
 
-for obj in coleccion.objects:
-    obj.select_set(True)
+    if not coleccion.objects:
+        print(f"AVISO: colección '{{coleccion.name}}' vacía")
+        continue
 
-if coleccion.objects:
+    for obj in coleccion.objects:
+        obj.select_set(True)
+
+    fbx_path = os.path.join(params['fbx_dir'], f"coleccion_{{i:04d}}.fbx")
     bpy.context.view_layer.objects.active = coleccion.objects[0]
     bpy.ops.export_scene.fbx(
-        filepath=r'{fbx_path}',
+        filepath=fbx_path,
         use_selection=True,
         apply_unit_scale=True,
         apply_scale_options='FBX_SCALE_NONE',
@@ -133,44 +194,44 @@ if coleccion.objects:
         axis_forward='-Z',
         axis_up='Y'
     )
-else:
-    print('ERROR: colección vacía')
+    exportadas.append({{'coleccion': coleccion.name, 'fbx': fbx_path}})
+
+with open(params['exportadas'], 'w', encoding='utf-8') as f:
+    json.dump({{'mtime': os.path.getmtime(bpy.data.filepath), 'colecciones': exportadas}}, f)
+
+if not exportadas:
+    print('ERROR: ninguna colección exportada')
     sys.exit(1)
 """)
 
-        subprocess.run([blender_path, ruta_blend, "--background", "--python", export_script])
-
-        if not os.path.exists(fbx_path):
-            self.report({'ERROR'}, "No se generó el archivo FBX al exportar desde el archivo fuente.")
-            shutil.rmtree(temp_dir)
-            return {'CANCELLED'}
+    etapas.append(("Exportar FBX", [blender_path, ruta_blend, "--background", "--python-exit-code", "1", "--python", export_script]))
 
-        # -------------------------------------------------------------------
-        # SCRIPT: IMPORTAR FBX EN EL ARCHIVO DESTINO
-        # -------------------------------------------------------------------
+    # -------------------------------------------------------------------
+    # SCRIPT: IMPORTAR FBX EN EL ARCHIVO DESTINO
+    # -------------------------------------------------------------------
 
-        import_script = os.path.join(temp_dir, "import_script.py")
-        with open(import_script, "w") as f:
-            f.write(f"""
+    import_script = os.path.join(temp_dir, "import_script.py")
+    with open(import_script, "w") as f:
+        f.write(f"""
 import bpy
+import importlib
+import json
+import os
 import sys
 
-fbx_path = r'{fbx_path}'
-coleccion_nombre = '{coleccion_nombre}'
 coleccion_padre = 'Blocking'
 
-# Si existe la colección, eliminarla completamente
-if coleccion_nombre in bpy.data.collections:
-    col = bpy.data.collections[coleccion_nombre]
-    for obj in list(col.objects):
-        bpy.data.objects.remove(obj, do_unlink=True)
-    bpy.data.collections.remove(col)
-
-# Importar FBX
-bpy.ops.import_scene.fbx(filepath=fbx_path)
+with open(r'{params_path}', encoding='utf-8') as f:
+    params = json.load(f)
+with open(params['exportadas'], encoding='utf-8') as f:
+    resultado = json.load(f)
+exportadas = resultado['colecciones']
 
-# Crear colección nueva
-new_col = bpy.data.collections.new(coleccion_nombre)
+# Registro de sincronizaciones del destino (ver sync_ledger)
+sys.path.insert(0, os.path.dirname(params['addon_dir']))
+sync_ledger = importlib.import_module(os.path.basename(params['addon_dir']) + '.sync_ledger')
+mesh_bake = importlib.import_module(os.path.basename(params['addon_dir']) + '.mesh_bake')
+ledger = sync_ledger.read_ledger()
 
 # Obtener o crear colección padre
 if coleccion_padre in bpy.data.collections:
@@ -179,21 +240,160 @@ else:
     parent_col = bpy.data.collections.new(coleccion_padre)
     bpy.context.scene.collection.children.link(parent_col)
 
-parent_col.children.link(new_col)
-
-# Mover objetos importados a la colección
-for obj in bpy.context.selected_objects:
-    bpy.ops.object.transform_apply(location=True, rotation=True, scale=True)
-    for c in obj.users_collection:
-        c.objects.unlink(obj)
-    new_col.objects.link(obj)
-
+for entrada in exportadas:
+    fbx_path = entrada['fbx']
+    coleccion_nombre = entrada['coleccion']
+
+    if not os.path.exists(fbx_path):
+        print(f"ERROR: no se generó el FBX de '{{coleccion_nombre}}'")
+        sys.exit(1)
+
+    # Si existe la colección, eliminarla completamente
+    if coleccion_nombre in bpy.data.collections:
+        col = bpy.data.collections[coleccion_nombre]
+        for obj in list(col.objects):
+            bpy.data.objects.remove(obj, do_unlink=True)
+        bpy.data.collections.remove(col)
+
+    # Solo lo recién importado debe quedar seleccionado
+    for obj in bpy.context.selected_objects:
+        obj.select_set(False)
+
+    # Importar FBX
+    bpy.ops.import_scene.fbx(filepath=fbx_path)
+
+    # Crear colección nueva
+    new_col = bpy.data.collections.new(coleccion_nombre)
+    parent_col.children.link(new_col)
+
+    importados = list(bpy.context.selected_objects)
+
+    # Transformaciones horneadas con numpy, una vez por malla
+    # (transform_apply dentro del bucle aplicaba a toda la selección: O(n²))
+    mesh_bake.bake_world_transforms(importados)
+
+    # Mover objetos importados a la colección: agrupar por colección de origen
+    por_coleccion = {{}}
+    for obj in importados:
+        for c in obj.users_collection:
+            por_coleccion.setdefault(c.as_pointer(), (c, []))[1].append(obj)
+    for c, objs in por_coleccion.values():
+        for obj in objs:
+            c.objects.unlink(obj)
+    for obj in importados:
+        new_col.objects.link(obj)
+
+    # Sin hash de geometría en modo FBX: solo la comprobación por mtime
+    sync_ledger.record_sync(ledger, coleccion_nombre, params['fuente'], resultado['mtime'])
+    print(f"OK: '{{coleccion_nombre}}'")
+
+sync_ledger.write_ledger(ledger)
 bpy.ops.wm.save_mainfile()
 """)
 
-        subprocess.run([blender_path, target_blend, "--background", "--python", import_script])
+    etapas.append(("Importar FBX", [blender_path, target_blend, "--background", "--python-exit-code", "1", "--python", import_script]))
+    return etapas
+
+
+# ---------------------------------------------------------------------------
+# OPERADOR PRINCIPAL
+# ---------------------------------------------------------------------------
+
+class OBJECT_OT_actualizar_coleccion_externa(Operator):
+    bl_idname = "object.actualizar_coleccion_externa"
+    bl_label = "Actualizar colección externa"
+    bl_description = "Exporta desde el archivo fuente y actualiza la colección en el archivo Blocking correspondiente"
+
+    @classmethod
+    def poll(cls, context):
+        return True
+
+    def preparar(self, context):
+        """
+        Valida rutas, descarta las colecciones sin cambios y construye las
+        etapas. Devuelve (preparado, estado): preparado es (colecciones,
+        target_blend, etapas, temp_dir) o None si no hay nada que lanzar.
+        """
+        props = context.scene.actualizar_fbx_props
+        ruta_blend = bpy.path.abspath(props.ruta_blend)
+        patrones = nombres_coleccion(props.nombre_coleccion)
+        if not patrones:
+            self.report({'ERROR'}, "Indica al menos una colección.")
+            return None, {'CANCELLED'}
+
+        # -------------------------------------------------------------------
+        # VALIDACIÓN DEL ARCHIVO FUENTE
+        # -------------------------------------------------------------------
+        if not os.path.exists(ruta_blend):
+            self.report({'ERROR'}, "Archivo fuente (.blend) no encontrado.")
+            return None, {'CANCELLED'}
+
+        colecciones = resolver_en_fuente(ruta_blend, patrones)
+        if not colecciones:
+            self.report({'ERROR'}, f"Ninguna colección de la fuente coincide con '{props.nombre_coleccion}'.")
+            return None, {'CANCELLED'}
 
-        shutil.rmtree(temp_dir)
+        # -------------------------------------------------------------------
+        # ARCHIVO ACTUAL (EL CUTTER) → ARCHIVO DESTINO
+        # -------------------------------------------------------------------
+        target_blend, error = resolver_destino(bpy.path.abspath(bpy.data.filepath))
+        if error:
+            self.report({'ERROR'}, error)
+            return None, {'CANCELLED'}
+
+        # Comprobación rápida con el registro del destino (sin lanzar Blender)
+        if not props.forzar:
+            pendientes = pendientes_segun_registro(ruta_blend, colecciones, target_blend)
+            if not pendientes:
+                self.report({'INFO'}, f"Sin cambios desde la última sincronización ({len(colecciones)} colecciones)")
+                return None, {'FINISHED'}
+            colecciones = pendientes
+
+        # Crear carpetas si no existen
+        os.makedirs(os.path.dirname(target_blend), exist_ok=True)
+
+        blender_path = bpy.app.binary_path
+        temp_dir = tempfile.mkdtemp()
+        if props.modo == 'APPEND':
+            etapas = etapas_append(blender_path, ruta_blend, colecciones, target_blend, props.forzar)
+        else:
+            etapas = etapas_fbx(blender_path, ruta_blend, colecciones, target_blend, temp_dir)
+        return (colecciones, target_blend, etapas, temp_dir), {'FINISHED'}
+
+    def execute(self, context):
+        preparado, estado = self.preparar(context)
+        if preparado is None:
+            return estado
+        colecciones, target_blend, etapas, temp_dir = preparado
+        coleccion_nombre = ", ".join(colecciones)
+
+        try:
+            for nombre, cmd in etapas:
+                proceso = subprocess.run(cmd)
+                if proceso.returncode != 0:
+                    self.report({'ERROR'}, f"Falló la etapa '{nombre}' (código {proceso.returncode}), ver consola.")
+                    return {'CANCELLED'}
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        self.report({'INFO'}, f"Colecciones '{coleccion_nombre}' actualizadas correctamente:\n{target_blend}")
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        # Desde la interfaz: procesos en segundo plano (ver sync_queue)
+        from . import sync_queue
+
+        preparado, estado = self.preparar(context)
+        if preparado is None:
+            return estado
+        colecciones, target_blend, etapas, temp_dir = preparado
+        coleccion_nombre = ", ".join(colecciones)
+
+        if sync_queue.en_curso(coleccion_nombre, target_blend):
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            self.report({'ERROR'}, f"La colección '{coleccion_nombre}' ya se está sincronizando")
+            return {'CANCELLED'}
 
-        self.report({'INFO'}, f"Colección '{coleccion_nombre}' actualizada correctamente:\n{target_blend}")
+        sync_queue.encolar(sync_queue.SyncJob(coleccion_nombre, target_blend, etapas, temp_dir))
+        self.report({'INFO'}, f"Sincronizando '{coleccion_nombre}' en segundo plano")
         return {'FINISHED'}
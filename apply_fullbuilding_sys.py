@@ -1,7 +1,11 @@
 import bpy
+from bpy.props import BoolProperty
 from mathutils import Vector
 import re
 
+from . import containment
+from .spatial_index import SpatialGrid
+
 # =========================================================
 #               OPERATOR PRINCIPAL
 # =========================================================
@@ -16,6 +20,15 @@ class OBJECT_OT_apply_fullbuilding_sys(bpy.types.Operator):
         "Plates y Letters."
     )
 
+    share_identical_meshes: BoolProperty(
+        name="Compartir mallas idénticas",
+        description=(
+            "Las fachadas que comparten la misma malla de origen usan una sola malla "
+            "S_..._Coll (con el nombre de la primera) en lugar de una copia por edificio"
+        ),
+        default=False,
+    )
+
     @classmethod
     def poll(cls, context):
         collection_names = [
@@ -38,8 +51,13 @@ class OBJECT_OT_apply_fullbuilding_sys(bpy.types.Operator):
         organize_objects()
         context.view_layer.update()
 
-        detect_walls_inside_buildings()
+        matching = detect_walls_inside_buildings(self.share_identical_meshes)
         context.view_layer.update()
+        if matching and (matching["unmatched"] or matching["multiple"]):
+            self.report({'WARNING'}, (
+                f"Matching: {len(matching['unmatched'])} sin edificio, "
+                f"{len(matching['multiple'])} en varios edificios (ver consola)."
+            ))
 
         process_facades()
         context.view_layer.update()
@@ -52,50 +70,64 @@ class OBJECT_OT_apply_fullbuilding_sys(bpy.types.Operator):
 #            FUNCIONES AUXILIARES GENERALES
 # =========================================================
 
+_NUMERIC_SUFFIX = re.compile(r'\.\d+$')
+
+
 def clean_name(name):
-    return re.sub(r'\.\d+$', '', name)
+    return _NUMERIC_SUFFIX.sub('', name)
+
+
+def build_mesh_lookup():
+    """Tabla nombre -> mesh construida una vez por ejecución."""
+    return {mesh.name: mesh for mesh in bpy.data.meshes}
 
 
-def update_object_data(obj, new_name):
+def update_object_data(obj, new_name, mesh_lookup=None, shared_copies=None):
     """
     Cambia la data del objeto a una copia única con el nombre adecuado.
+    mesh_lookup: tabla de build_mesh_lookup() (se mantiene al crear copias).
+    shared_copies: si se pasa un dict (puntero de la malla de origen -> malla),
+    los objetos con la misma malla de origen comparten una sola malla S_..._Coll,
+    con el nombre que le dio el primero de ellos.
     """
     new_name = clean_name(new_name)
     if not obj.data:
         return
 
+    source_key = obj.data.as_pointer()
+    if shared_copies is not None and source_key in shared_copies:
+        obj.data = shared_copies[source_key]
+        return
+
     new_data_name = new_name.replace("P_", "S_") + "_Coll"
 
-    existing = bpy.data.meshes.get(new_data_name)
+    existing = mesh_lookup.get(new_data_name) if mesh_lookup is not None else bpy.data.meshes.get(new_data_name)
     if existing:
         obj.data = existing
     else:
         obj.data = obj.data.copy()
         obj.data.name = new_data_name
+        if mesh_lookup is not None:
+            mesh_lookup[obj.data.name] = obj.data
 
-
-def expand_volume(container, expansion):
-    bbox = [container.matrix_world @ Vector(corner) for corner in container.bound_box]
-    min_corner = Vector([min(v[i] for v in bbox) for i in range(3)])
-    max_corner = Vector([max(v[i] for v in bbox) for i in range(3)])
-    return min_corner - expansion, max_corner + expansion
+    if shared_copies is not None:
+        shared_copies[source_key] = obj.data
 
 
 def is_point_inside_volume(container, point, expansion=Vector((0.1, 0.1, 0.1))):
-    mn, mx = expand_volume(container, expansion)
-    return all(mn[i] <= point[i] <= mx[i] for i in range(3))
+    # AABB en mundo cacheado por objeto (ver containment.py)
+    return containment.is_point_inside(container, point, expansion, local=False)
 
 
-def force_refresh(objects, delta=0.001):
+def force_refresh(objects):
     """
-    Soluciona problemas de actualización forzando cambios leves.
+    Marca los objetos (transformación y data, incluidos sus modificadores)
+    como modificados y evalúa el depsgraph una sola vez para todo el lote.
+    Cambiar Socket_X como ID property no etiqueta el depsgraph por sí solo.
     """
     for obj in objects:
-        old = obj.location.copy()
-        obj.location.x += delta
-        bpy.context.view_layer.update()
-        obj.location = old
-        bpy.context.view_layer.update()
+        obj.update_tag(refresh={'OBJECT', 'DATA'})
+    bpy.context.view_layer.update()
 
 
 def move_objects_to_collection(objects, target_collection):
@@ -108,36 +140,6 @@ def move_objects_to_collection(objects, target_collection):
                 col.objects.unlink(obj)
 
 
-def make_collection_instances_real(collection):
-    if not collection or not collection.objects:
-        print(f"[make_collection_instances_real] ❌ '{collection.name}' vacía o no existe.")
-        return []
-
-    original = {o.name for o in collection.objects}
-
-    bpy.ops.object.select_all(action='DESELECT')
-    for obj in collection.objects:
-        obj.select_set(True)
-
-    bpy.context.view_layer.objects.active = collection.objects[0]
-    bpy.ops.object.duplicates_make_real()
-
-    new_objects = [
-        o for o in bpy.context.selected_objects
-        if o.name not in original
-    ]
-
-    move_objects_to_collection(new_objects, collection)
-
-    for name in original:
-        obj = bpy.data.objects.get(name)
-        if obj:
-            bpy.data.objects.remove(obj, do_unlink=True)
-
-    print(f"[make_collection_instances_real] {len(new_objects)} creados en '{collection.name}'")
-    return new_objects
-
-
 # =========================================================
 #               PASO 1 – ORGANIZAR OBJETOS
 # =========================================================
@@ -172,34 +174,71 @@ def organize_objects():
 #       PASO 2 – MATCH WALL/APT INSIDE BUILDINGS
 # =========================================================
 
-def detect_walls_inside_buildings():
+BUILDING_EXPANSION = Vector((0.1, 0.1, 0.1))
+
+
+def match_elements_to_buildings(buildings, elements, expansion=BUILDING_EXPANSION):
+    """
+    Resuelve cada elemento (Wall/APT) a su edificio en una sola pasada:
+    los AABB de los edificios salen de la caché de containment y los
+    elementos se consultan en una rejilla XY.
+    Devuelve ({puntero elemento: edificio}, [sin edificio], {puntero: [edificios]}).
+    Si un elemento cae en varios edificios gana el último, como antes.
+    """
+    grid = SpatialGrid(elements)
+    candidates = {}
+    for b in buildings:
+        for element in grid.query_volume(b, expansion, local=False):
+            candidates.setdefault(element.as_pointer(), []).append(b)
+
+    matches = {key: found[-1] for key, found in candidates.items()}
+    unmatched = [e for e in elements if e.as_pointer() not in candidates]
+    multiple = {key: found for key, found in candidates.items() if len(found) > 1}
+    return matches, unmatched, multiple
+
+
+def detect_walls_inside_buildings(share_identical_meshes=False):
     col_build = bpy.data.collections.get("Buildings_Exp")
     col_facad = bpy.data.collections.get("Facades_Exp")
 
     if not col_build or not col_facad:
         print("Faltan colecciones para matching.")
-        return
+        return None
 
     buildings = [o for o in col_build.objects if "_Building_" in o.name]
     walls = [o for o in col_facad.objects if "_Wall_" in o.name]
     apts = [o for o in col_facad.objects if "_APT_" in o.name]
 
-    for b in buildings:
-        num = b.name.split("_")[3]
-
-        for w in walls:
-            if is_point_inside_volume(b, w.location):
-                new = clean_name(w.name.replace(w.name.split("_")[3], num))
-                w.name = new
-                update_object_data(w, new)
-
-        for a in apts:
-            if is_point_inside_volume(b, a.location):
-                new = clean_name(a.name.replace(a.name.split("_")[4], num))
-                a.name = new
-                update_object_data(a, new)
+    mesh_lookup = build_mesh_lookup()
+    shared_copies = {} if share_identical_meshes else None
+
+    # Índice del número de edificio en el nombre: Wall -> 3, APT -> 4
+    report = {"unmatched": [], "multiple": []}
+    for elements, num_index in ((walls, 3), (apts, 4)):
+        matches, unmatched, multiple = match_elements_to_buildings(buildings, elements)
+
+        for e in elements:
+            b = matches.get(e.as_pointer())
+            if b is None:
+                continue
+            num = b.name.split("_")[3]
+            new = clean_name(e.name.replace(e.name.split("_")[num_index], num))
+            e.name = new
+            update_object_data(e, new, mesh_lookup, shared_copies)
+
+        report["unmatched"].extend(e.name for e in unmatched)
+        report["multiple"].extend(
+            (e.name, [b.name for b in multiple[e.as_pointer()]])
+            for e in elements if e.as_pointer() in multiple
+        )
+
+    for name in report["unmatched"]:
+        print(f"[matching] ⚠ '{name}' no está dentro de ningún edificio.")
+    for name, building_names in report["multiple"]:
+        print(f"[matching] ⚠ '{name}' está en varios edificios: {', '.join(building_names)}")
 
     print("Paso 02: Walls/APT actualizados.")
+    return report
 
 
 # =========================================================
@@ -221,67 +260,101 @@ def process_facades():
             m = obj.modifiers.new(name="Facades_Plates", type='NODES')
             m.node_group = bpy.data.node_groups.get("Facades_Plates")
 
-    force_refresh(col_f.objects)
     print("Nodo aplicado en Facades.")
 
-    # ---------------------------------------------------------
-    # DUPLICAR PARA PLATES
-    # ---------------------------------------------------------
-    duplicates_p = []
-
-    for obj in col_f.objects:
-        obj.modifiers["Facades_Plates"]["Socket_2"] = 1
-
-        dup = bpy.data.objects.new(obj.name + "_plate", obj.data)
-        dup.location = obj.location.copy()
-        dup.rotation_euler = obj.rotation_euler.copy()
-        dup.scale = obj.scale.copy()
-
-        for mod in obj.modifiers:
-            if mod.type == 'NODES' and mod.name == "Facades_Plates":
-                new_mod = dup.modifiers.new(name=mod.name, type='NODES')
-                new_mod.node_group = mod.node_group
-                for key in mod.keys():
-                    if key.startswith("Socket_"):
-                        new_mod[key] = mod[key]
-
-        duplicates_p.append(dup)
-
-    move_objects_to_collection(duplicates_p, col_p)
-    force_refresh(col_f.objects)
-    make_collection_instances_real(col_p)
+    facades = list(col_f.objects)
 
-    # ---------------------------------------------------------
-    # DUPLICAR PARA LETTERS
-    # ---------------------------------------------------------
-    duplicates_l = []
-
-    for obj in col_f.objects:
-        obj.modifiers["Facades_Plates"]["Socket_2"] = 2
-
-        dup = bpy.data.objects.new(obj.name + "_letter", obj.data)
-        dup.location = obj.location.copy()
-        dup.rotation_euler = obj.rotation_euler.copy()
-        dup.scale = obj.scale.copy()
-
-        for mod in obj.modifiers:
-            if mod.type == 'NODES' and mod.name == "Facades_Plates":
-                new_mod = dup.modifiers.new(name=mod.name, type='NODES')
-                new_mod.node_group = mod.node_group
-                for key in mod.keys():
-                    if key.startswith("Socket_"):
-                        new_mod[key] = mod[key]
-
-        duplicates_l.append(dup)
-
-    move_objects_to_collection(duplicates_l, col_l)
-    force_refresh(col_f.objects)
-    make_collection_instances_real(col_l)
+    # Socket_2: 1 = Plates, 2 = Letters
+    realize_facade_instances(facades, 1, col_p)
+    realize_facade_instances(facades, 2, col_l)
 
     # Restaurar el nodo original (Socket_2 = 0)
-    for obj in col_f.objects:
+    for obj in facades:
         obj.modifiers["Facades_Plates"]["Socket_2"] = 0
 
-    force_refresh(col_f.objects)
+    force_refresh(facades)
     print("Paso 03: Plates y Letters generados.")
 
+
+def clear_collection_objects(collection):
+    """Borra los objetos de la colección (y sus mallas si quedan sin usuarios)."""
+    for obj in list(collection.objects):
+        data = obj.data
+        bpy.data.objects.remove(obj, do_unlink=True)
+        if isinstance(data, bpy.types.Mesh) and data.users == 0:
+            bpy.data.meshes.remove(data)
+
+
+def realize_facade_instances(facades, mode, target_collection):
+    """
+    Pone Facades_Plates en el modo indicado, evalúa el depsgraph una vez y
+    crea directamente en target_collection un objeto por cada instancia
+    generada por las fachadas (equivale a duplicates_make_real, sin objetos
+    temporales ni operadores de selección). Vacía antes la colección, como
+    hacía make_collection_instances_real.
+
+    Las instancias de objetos reales (las letras FONT) se copian con su tipo
+    y su texto, así que rename_plates las sigue encontrando en Letters_Exp
+    (filtra por type == 'FONT' y lee data.body). La geometría creada dentro
+    del node tree se convierte a malla; la que no es malla ni se puede
+    convertir se salta y se avisa.
+    """
+    clear_collection_objects(target_collection)
+
+    for obj in facades:
+        obj.modifiers["Facades_Plates"]["Socket_2"] = mode
+
+    force_refresh(facades)
+
+    facade_keys = {obj.as_pointer() for obj in facades}
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+
+    # Las instancias del iterador son temporales: copiar lo necesario al vuelo
+    pending = []
+    skipped = 0
+    for inst in depsgraph.object_instances:
+        if not inst.is_instance or inst.parent is None:
+            continue
+        parent = inst.parent.original
+        if parent.as_pointer() not in facade_keys:
+            continue
+
+        matrix = inst.matrix_world.copy()
+        source = inst.instance_object.original if inst.instance_object else None
+
+        if source is not None and not source.is_evaluated and source.as_pointer() != parent.as_pointer():
+            # Instancia de un objeto real (malla o texto): se copia después del recorrido
+            pending.append((source, None, matrix))
+            continue
+
+        # Geometría instanciada dentro del node tree: convertirla a malla
+        if inst.object.type not in {'MESH', 'CURVE', 'FONT', 'SURFACE', 'META'}:
+            skipped += 1
+            continue
+        try:
+            mesh = bpy.data.meshes.new_from_object(inst.object)
+        except RuntimeError:
+            skipped += 1
+            continue
+        if not mesh.vertices:
+            bpy.data.meshes.remove(mesh)
+            skipped += 1
+            continue
+        pending.append((None, (parent.name + "_" + target_collection.name, mesh), matrix))
+
+    realized = []
+    for source, mesh_data, matrix in pending:
+        if source is not None:
+            # Copia que comparte la data (como duplicates_make_real)
+            new_obj = source.copy()
+            new_obj.parent = None
+        else:
+            new_obj = bpy.data.objects.new(*mesh_data)
+        new_obj.matrix_world = matrix
+        target_collection.objects.link(new_obj)
+        realized.append(new_obj)
+
+    if skipped:
+        print(f"[realize_facade_instances] ⚠ {skipped} instancias sin geometría de malla saltadas en '{target_collection.name}'")
+    print(f"[realize_facade_instances] {len(realized)} creados en '{target_collection.name}'")
+    return realized
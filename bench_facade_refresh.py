@@ -0,0 +1,91 @@
+# Benchmark: refresco de fachadas (force_refresh) antes / después.
+#
+# Uso (desde la carpeta del addon):
+#   blender --background --factory-startup --python bench_facade_refresh.py -- [num_fachadas]
+#
+# Crea una colección sintética de fachadas con un modificador Geometry Nodes
+# (entrada Socket_2 como en Facades_Plates) y mide el refresco antiguo
+# (mover 0.001, update, restaurar, update por objeto) contra el nuevo
+# force_refresh de apply_fullbuilding_sys (update_tag + un solo update).
+
+import bpy
+import importlib
+import os
+import sys
+import time
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(ADDON_DIR))
+apply_fullbuilding_sys = importlib.import_module(os.path.basename(ADDON_DIR) + ".apply_fullbuilding_sys")
+
+
+def legacy_force_refresh(objects, delta=0.001):
+    """Versión anterior: dos evaluaciones completas del depsgraph por objeto."""
+    for obj in objects:
+        old = obj.location.copy()
+        obj.location.x += delta
+        bpy.context.view_layer.update()
+        obj.location = old
+        bpy.context.view_layer.update()
+
+
+def build_node_group():
+    ng = bpy.data.node_groups.new("Bench_Facades_Plates", 'GeometryNodeTree')
+    ng.interface.new_socket(name="Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+    ng.interface.new_socket(name="Mode", in_out='INPUT', socket_type='NodeSocketInt')
+    ng.interface.new_socket(name="Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+
+    group_in = ng.nodes.new('NodeGroupInput')
+    group_out = ng.nodes.new('NodeGroupOutput')
+    subdivide = ng.nodes.new('GeometryNodeSubdivideMesh')
+    ng.links.new(group_in.outputs[0], subdivide.inputs["Mesh"])
+    ng.links.new(group_in.outputs[1], subdivide.inputs["Level"])
+    ng.links.new(subdivide.outputs[0], group_out.inputs[0])
+    return ng
+
+
+def build_facades(count):
+    collection = bpy.data.collections.new("Bench_Facades_Exp")
+    bpy.context.scene.collection.children.link(collection)
+
+    mesh = bpy.data.meshes.new("Bench_Facade")
+    mesh.from_pydata([(0, 0, 0), (1, 0, 0), (1, 0, 1), (0, 0, 1)], [], [(0, 1, 2, 3)])
+    node_group = build_node_group()
+    socket = next(item.identifier for item in node_group.interface.items_tree if item.name == "Mode")
+
+    side = max(1, int(count ** 0.5))
+    for i in range(count):
+        obj = bpy.data.objects.new(f"P_Facade_{i:05d}", mesh)
+        obj.location = ((i % side) * 2.0, (i // side) * 2.0, 0.0)
+        mod = obj.modifiers.new(name="Facades_Plates", type='NODES')
+        mod.node_group = node_group
+        mod[socket] = 1
+        collection.objects.link(obj)
+
+    bpy.context.view_layer.update()
+    return collection
+
+
+def timed(label, func, objects):
+    start = time.perf_counter()
+    func(objects)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:10.3f} s")
+    return elapsed
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    count = int(argv[0]) if argv else 1000
+
+    collection = build_facades(count)
+    objects = list(collection.objects)
+
+    print(f"\nFachadas sintéticas: {count}")
+    before = timed("force_refresh (anterior)", legacy_force_refresh, objects)
+    after = timed("force_refresh (update_tag)", apply_fullbuilding_sys.force_refresh, objects)
+    print(f"{'Aceleración':<28} {before / after if after else float('inf'):10.1f} x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# Línea de comandos del addon para ejecutar sin interfaz (granja de render / CI).
+#
+#   blender -b mapa.blend --python cli.py -- export   --collection Set_Dressing --output D:/fbx [--force] [--parallel] [--workers N]
+#   blender -b mapa.blend --python cli.py -- validate --collection BR_Buildings
+#   blender -b mapa.blend --python cli.py -- report   --output D:/reportes/
+#
+# Todos los comandos aceptan --json RUTA para guardar el resumen con tiempos;
+# el mismo JSON se imprime siempre en la última línea de la salida.
+#
+# Códigos de salida:
+#   0  todo correcto
+#   1  el comando terminó con errores (exportaciones fallidas, nombres inválidos...)
+#   2  argumentos inválidos (colección o carpeta inexistente)
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+import traceback
+
+import bpy
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(ADDON_DIR))
+PACKAGE = os.path.basename(ADDON_DIR)
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+class UsageError(Exception):
+    pass
+
+
+def addon_module(name):
+    return importlib.import_module(f"{PACKAGE}.{name}")
+
+
+def get_collection(name):
+    collection = bpy.data.collections.get(name)
+    if collection is None:
+        raise UsageError(f"colección no encontrada: {name}")
+    return collection
+
+
+# ==============================================================
+#   COMANDOS
+# ==============================================================
+
+def cmd_export(args):
+    export_fbx = addon_module("export_fbx")
+
+    export_path = os.path.abspath(args.output)
+    if not os.path.isdir(export_path):
+        raise UsageError(f"la carpeta no existe: {export_path}")
+
+    collections = []
+    for name in args.collection:
+        collections.extend(export_fbx.get_export_collections(get_collection(name)))
+
+    plan = export_fbx.plan_export(collections, export_path, force=args.force)
+    parallel = args.parallel and len(plan["pending"]) > 1
+    results = export_fbx.export_pending(plan["pending"], export_path, parallel, args.workers)
+    level, message = export_fbx.OBJECT_OT_export_fbx.summarize(plan, results)
+    print(message)
+
+    summary = {
+        "exported": sum(1 for r in results if r["file"] and not r["error"]),
+        "skipped": plan["skipped"],
+        "empty": plan["empty"],
+        "warnings": plan["warnings"],
+        "estimated_bytes": plan["estimated_bytes"],
+        "estimated_seconds": plan["estimated_seconds"],
+        "errors": sum(1 for r in results if r["error"]),
+        "results": results,
+    }
+    return (EXIT_FAILED if summary["errors"] else EXIT_OK), summary
+
+
+def cmd_validate(args):
+    naming_rules = addon_module("naming_rules")
+
+    violations = []
+    for name in args.collection:
+        for violation in naming_rules.iter_violations(get_collection(name)):
+            print(violation.message)
+            violations.append({"collection": name, "object": violation.obj.name, "message": violation.message})
+
+    return (EXIT_FAILED if violations else EXIT_OK), {"violations": violations}
+
+
+def cmd_report(args):
+    generate_csv_report = addon_module("generate_csv_report")
+
+    if "Buildings_Exp" not in bpy.data.collections:
+        raise UsageError("no existe la colección Buildings_Exp")
+
+    csv_filepath = os.path.abspath(args.output)
+    if os.path.isdir(csv_filepath):
+        csv_filepath = os.path.join(csv_filepath, "reporte_entradas.csv")
+
+    report = generate_csv_report.write_csv_report(csv_filepath)
+    print(f"Archivo CSV generado: {csv_filepath}")
+    return (EXIT_FAILED if report["errors"] else EXIT_OK), report
+
+
+COMMANDS = {
+    "export": cmd_export,
+    "validate": cmd_validate,
+    "report": cmd_report,
+}
+
+
+# ==============================================================
+#   ENTRADA
+# ==============================================================
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="map_tools_cli", description="Herramientas del mapa sin interfaz")
+    parser.add_argument("--json", help="Guardar el resumen JSON (con tiempos) en esta ruta")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Exportar colecciones a FBX (una por colección hija)")
+    export.add_argument("--collection", action="append", required=True, help="Colección a exportar (repetible)")
+    export.add_argument("--output", required=True, help="Carpeta de destino de los FBX")
+    export.add_argument("--force", action="store_true", help="Exportar aunque el contenido no haya cambiado")
+    export.add_argument("--parallel", action="store_true", help="Exportar en procesos Blender en segundo plano")
+    export.add_argument("--workers", type=int, default=0, help="Procesos en paralelo (0 = núcleos)")
+
+    validate = sub.add_parser("validate", help="Validar la nomenclatura de edificios")
+    validate.add_argument("--collection", action="append", required=True, help="Colección a validar (repetible)")
+
+    report = sub.add_parser("report", help="Generar el reporte CSV de entradas")
+    report.add_argument("--output", required=True, help="Archivo CSV o carpeta de destino")
+
+    # El --json global también se acepta después del comando
+    for command in (export, validate, report):
+        command.add_argument("--json", default=argparse.SUPPRESS, help=argparse.SUPPRESS)
+
+    return parser.parse_args(argv)
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    args = parse_args(argv)
+
+    summary = {"command": args.command, "blend": bpy.data.filepath, "status": "ok"}
+    start = time.perf_counter()
+    try:
+        code, result = COMMANDS[args.command](args)
+        summary.update(result)
+        if code != EXIT_OK:
+            summary["status"] = "failed"
+    except UsageError as e:
+        code = EXIT_USAGE
+        summary.update(status="usage", error=str(e))
+        print(f"Error: {e}", file=sys.stderr)
+    except Exception:
+        code = EXIT_FAILED
+        summary.update(status="error", error=traceback.format_exc().strip().splitlines()[-1])
+        traceback.print_exc()
+    summary["seconds"] = time.perf_counter() - start
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    print(json.dumps(summary))
+
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
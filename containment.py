@@ -0,0 +1,142 @@
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+
+
+# ==============================================================
+#   CACHÉ DE VOLÚMENES CONTENEDORES
+# ==============================================================
+# Por cada contenedor (clave: as_pointer) se guarda una sola vez su
+# bound_box local, su AABB en mundo y la matriz inversa. Las entradas
+# se invalidan en depsgraph_update_post cuando cambia la transformación
+# o la geometría del objeto, y se vacía todo al cargar otro .blend.
+
+_cache = {}
+
+
+class ContainerBounds:
+    __slots__ = ("name", "local_min", "local_max", "world_min", "world_max", "rot", "loc", "inv_rot", "inv_loc")
+
+    def __init__(self, container):
+        corners = np.array([corner[:] for corner in container.bound_box], dtype=np.float64)
+        mw = np.array(container.matrix_world, dtype=np.float64)
+        inv = np.array(container.matrix_world.inverted(), dtype=np.float64)
+
+        world = corners @ mw[:3, :3].T + mw[:3, 3]
+
+        self.name = container.name_full
+        self.local_min = corners.min(axis=0)
+        self.local_max = corners.max(axis=0)
+        self.world_min = world.min(axis=0)
+        self.world_max = world.max(axis=0)
+        self.rot = mw[:3, :3]
+        self.loc = mw[:3, 3]
+        self.inv_rot = inv[:3, :3]
+        self.inv_loc = inv[:3, 3]
+
+    def box(self, expansion, local=True):
+        e = _as_expansion(expansion)
+        if local:
+            return self.local_min - e, self.local_max + e
+        return self.world_min - e, self.world_max + e
+
+    def world_box(self, expansion, local=True):
+        """AABB en mundo que envuelve el volumen de test (para consultas en rejilla)."""
+        if not local:
+            return self.box(expansion, local=False)
+        mn, mx = self.box(expansion, local=True)
+        corners = np.array([
+            (x, y, z) for x in (mn[0], mx[0]) for y in (mn[1], mx[1]) for z in (mn[2], mx[2])
+        ])
+        world = corners @ self.rot.T + self.loc
+        return world.min(axis=0), world.max(axis=0)
+
+
+def _as_expansion(expansion):
+    if isinstance(expansion, (int, float)):
+        return np.full(3, float(expansion))
+    return np.array(expansion[:3], dtype=np.float64)
+
+
+def get_bounds(container):
+    key = container.as_pointer()
+    bounds = _cache.get(key)
+    # el nombre protege contra punteros reutilizados tras borrar objetos
+    if bounds is None or bounds.name != container.name_full:
+        bounds = ContainerBounds(container)
+        _cache[key] = bounds
+    return bounds
+
+
+def invalidate(obj):
+    _cache.pop(obj.as_pointer(), None)
+
+
+def clear_cache():
+    _cache.clear()
+
+
+# ==============================================================
+#   TESTS DE CONTENCIÓN
+# ==============================================================
+
+def is_point_inside(container, point, expansion=0.01, local=True):
+    """
+    local=True  -> punto dentro del bound_box local expandido
+    local=False -> punto dentro del AABB en mundo expandido
+    """
+    return bool(points_inside(container, (point[:3],), expansion, local)[0])
+
+
+def points_inside(container, points, expansion=0.01, local=True):
+    """Máscara booleana: cuáles de los N puntos (Nx3, espacio mundo) están dentro."""
+    bounds = get_bounds(container)
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    mn, mx = bounds.box(expansion, local)
+    if local:
+        pts = pts @ bounds.inv_rot.T + bounds.inv_loc
+    return np.all((pts >= mn) & (pts <= mx), axis=1)
+
+
+def locations_array(objects):
+    """Array Nx3 con obj.location de cada objeto."""
+    objects = list(objects)
+    arr = np.empty((len(objects), 3), dtype=np.float64)
+    for i, obj in enumerate(objects):
+        arr[i] = obj.location
+    return arr
+
+
+# ==============================================================
+#   HANDLERS
+# ==============================================================
+
+@persistent
+def _on_depsgraph_update(scene, depsgraph):
+    if not _cache or not depsgraph.id_type_updated('OBJECT'):
+        return
+    for update in depsgraph.updates:
+        if not (update.is_updated_transform or update.is_updated_geometry):
+            continue
+        if isinstance(update.id, bpy.types.Object):
+            _cache.pop(update.id.original.as_pointer(), None)
+
+
+@persistent
+def _on_load_post(*args):
+    clear_cache()
+
+
+def register_handlers():
+    if _on_depsgraph_update not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(_on_depsgraph_update)
+    if _on_load_post not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(_on_load_post)
+
+
+def unregister_handlers():
+    if _on_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_on_depsgraph_update)
+    if _on_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_on_load_post)
+    clear_cache()
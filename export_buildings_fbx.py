@@ -1,6 +1,22 @@
 import bpy
 import os
 
+from .export_copies import export_copies, select_only
+from .export_manifest import collection_hash, is_up_to_date, load_manifest, record_export, save_manifest
+from .naming_rules import iter_violations
+
+BUILDINGS_EXPORT_OPTIONS = {
+    "check_existing": True,
+    "use_selection": True,
+    "global_scale": 1,
+    "apply_unit_scale": True,
+    "bake_space_transform": True,
+    "object_types": {'MESH'},
+    "path_mode": 'AUTO',
+    "axis_forward": '-Z',
+    "axis_up": 'Y'
+}
+
 class OBJECT_OT_buildings_export_fbx(bpy.types.Operator):
     bl_idname = "object.buildings_export_fbx"
     bl_label = "Buildings Export FBX"
@@ -20,112 +36,54 @@ class OBJECT_OT_buildings_export_fbx(bpy.types.Operator):
         return vista_espacio.collection if vista_espacio else None
 
     def validar_nombres_y_renombrar(self, coleccion_seleccionada):
-        """Valida los nombres de los objetos en la colección seleccionada y renombra la data si no hay errores."""
+        """Valida los nombres de los objetos en la colección seleccionada y renombra la data de los válidos."""
         errores = []
-        for subcoleccion in coleccion_seleccionada.children:
-            colpart = subcoleccion.name.split("_")
-            tipo = colpart[1] if len(colpart) > 1 else ""
+        con_errores = set()
+        for violation in iter_violations(coleccion_seleccionada):
+            errores.append(violation.message)
+            con_errores.add(violation.obj.as_pointer())
 
+        for subcoleccion in coleccion_seleccionada.children:
             for obj in subcoleccion.objects:
-                partes = obj.name.split("_")
-
-                if len(partes) < 4:
-                    errores.append(f"Error en {obj.name}: nombre incompleto.")
-                    continue  # Saltar el resto de validaciones si el nombre es muy corto
-
-                if partes[0] != "S":
-                    errores.append(f"Error en {obj.name}: debe iniciar con 'S'")
-
-                if partes[1] != colpart[0]:
-                    errores.append(f"Error en {obj.name}: el prefijo debe ser {colpart[0]}")
-
-                if partes[2] != tipo:
-                    errores.append(f"Error en {obj.name}: esto es '{tipo}', no '{partes[2]}'")
-
-                if tipo in ("CH", "PUB", "APT") and partes[3] != "Entrance":
-                    errores.append(f"Error en {obj.name}: debe ser 'Entrance' en _{partes[3]}_")
-
-                if len(partes) > (3 if tipo in ("Building", "Wall", "BLimit") else 4) and partes[3 if tipo in ("Building", "Wall", "BLimit") else 4].isdigit():
-                    errores.append(f"Error en {obj.name}: el número debe ir acompañado de una letra")
-
-                if len(partes) > (4 if tipo in ("Building", "Wall", "BLimit") else 5) and partes[-1] not in ("LOD1", "LOD2", "Coll"):
-                    errores.append(f"Error en {obj.name}: sufijo '{partes[-1]}' no permitido")
-
-                if not errores:
+                if obj.as_pointer() not in con_errores and obj.data and obj.data.name != obj.name:
                     obj.data.name = obj.name  # Renombrar la data del objeto
 
         return len(errores) == 0, errores
 
+    def obtener_mallas(self, coleccion):
+        """Mallas de la colección validada (incluidas sus subcolecciones)."""
+        return [obj for obj in coleccion.all_objects if obj.type == 'MESH']
 
-    def guardar_materiales(self):
-        """Guarda los materiales de cada objeto."""
-        return {obj.name: [slot.material for slot in obj.material_slots] for obj in bpy.data.objects if obj.type == 'MESH'}
-
-    def limpiar_materiales(self):
-        """Elimina los materiales de los objetos."""
-        for obj in bpy.data.objects:
-            if obj.type == 'MESH':
-                obj.data.materials.clear()
-
-    def aplicar_transformaciones(self):
-        """Aplica la rotación y escala a todas las mallas."""
-        bpy.ops.object.select_all(action='DESELECT')
-        for obj in bpy.data.objects:
-            if obj.type == 'MESH':
-                obj.select_set(True)
-        bpy.ops.object.transform_apply(location=False, rotation=True, scale=True)
-
-    def exportar_fbx(self, ruta):
-        """Exporta las mallas seleccionadas como un solo FBX."""
+    @staticmethod
+    def exportar_fbx(ruta, meshes):
+        """Exporta las mallas indicadas como un solo FBX."""
         seleccionados = [obj for obj in bpy.context.selected_objects]
 
-        bpy.ops.object.select_all(action='DESELECT')
-        meshes = [obj for obj in bpy.data.objects if obj.type == 'MESH']
-        for obj in meshes:
-            obj.select_set(True)
-
-        self.aplicar_transformaciones()
-
-        if meshes:
-            bpy.context.view_layer.objects.active = meshes[0]
-
-        bpy.ops.export_scene.fbx(
-            filepath=ruta,
-            check_existing=True,
-            use_selection=True,
-            global_scale=1,
-            apply_unit_scale=True,
-            bake_space_transform=True,
-            object_types={'MESH'},
-            path_mode='AUTO',
-            axis_forward='-Z',
-            axis_up='Y'
-        )
+        # Rotación y escala se aplican en las copias de exportación, no en los originales
+        with export_copies(meshes, apply_transform=True) as copias:
+            select_only(copias)
+            bpy.ops.export_scene.fbx(filepath=ruta, **BUILDINGS_EXPORT_OPTIONS)
 
         bpy.ops.object.select_all(action='DESELECT')
         for obj in seleccionados:
             obj.select_set(True)
 
-    def restaurar_materiales(self, materiales_objetos):
-        """Restaura los materiales originales a los objetos."""
-        for obj in bpy.data.objects:
-            if obj.type == 'MESH' and obj.name in materiales_objetos:
-                obj.data.materials.clear()
-                for mat in materiales_objetos[obj.name]:
-                    obj.data.materials.append(mat)
-
-    def execute(self, context):
+    def preparar(self, context):
+        """
+        Valida la colección y calcula el hash. Devuelve (plan, estado): el plan
+        es None si no hay nada que exportar y estado es el resultado del operador.
+        """
         coleccion = self.obtener_coleccion_seleccionada()
         if not coleccion:
             self.report({'ERROR'}, "No hay una colección seleccionada.")
-            return {'CANCELLED'}
+            return None, {'CANCELLED'}
 
         validado, errores = self.validar_nombres_y_renombrar(coleccion)
         if not validado:
             self.show_error_message(["❌ No se pudo exportar por errores de nomenclatura"] + errores)
             for er in errores:
                 print (er)
-            return {'CANCELLED'}
+            return None, {'CANCELLED'}
 
         # Obtener la carpeta de exportación desde la escena
         export_folder = bpy.path.abspath(context.scene.export_folder)
@@ -134,10 +92,69 @@ class OBJECT_OT_buildings_export_fbx(bpy.types.Operator):
 
         ruta_fbx = os.path.join(export_folder, f"{coleccion.name}.fbx")
 
-        materiales_guardados = self.guardar_materiales()
-        self.limpiar_materiales()
-        self.exportar_fbx(ruta_fbx)
-        self.restaurar_materiales(materiales_guardados)
+        # Exportación incremental: no reescribir el FBX si el contenido no cambió
+        forzar = getattr(context.scene, "export_force", False)
+        manifest = load_manifest(export_folder)
+        mallas = self.obtener_mallas(coleccion)
+        digest = collection_hash(mallas, BUILDINGS_EXPORT_OPTIONS)
+        if not forzar and is_up_to_date(manifest, ruta_fbx, digest):
+            self.report({'INFO'}, f"⏭ Sin cambios desde la última exportación: {ruta_fbx}")
+            return None, {'FINISHED'}
+
+        return {
+            "export_folder": export_folder,
+            "ruta": ruta_fbx,
+            "mallas": [obj.name for obj in mallas],
+            "manifest": manifest,
+            "digest": digest,
+        }, {'FINISHED'}
+
+    @staticmethod
+    def exportar_plan(plan):
+        mallas = [bpy.data.objects[n] for n in plan["mallas"] if n in bpy.data.objects]
+        # Hash de lo que se escribe ahora: desde la cola, la escena pudo cambiar tras preparar()
+        digest = collection_hash(mallas, BUILDINGS_EXPORT_OPTIONS)
+        OBJECT_OT_buildings_export_fbx.exportar_fbx(plan["ruta"], mallas)
+
+        record_export(plan["manifest"], plan["ruta"], digest)
+        save_manifest(plan["export_folder"], plan["manifest"])
+        return {"collection": os.path.basename(plan["ruta"]), "file": plan["ruta"], "error": None}
+
+    def execute(self, context):
+        plan, estado = self.preparar(context)
+        if plan is None:
+            return estado
+
+        self.exportar_plan(plan)
+
+        self.report({'INFO'}, f"✅ Exportación completada: {plan['ruta']}")
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        # Desde la interfaz: exportar a través de la cola modal (progreso en la barra de estado)
+        from . import export_queue
 
-        self.report({'INFO'}, f"✅ Exportación completada: {ruta_fbx}")
+        if export_queue.is_running():
+            self.report({'ERROR'}, "Ya hay una exportación en curso")
+            return {'CANCELLED'}
+
+        plan, estado = self.preparar(context)
+        if plan is None:
+            return estado
+
+        def on_finish(results, cancelled):
+            if cancelled or not results:
+                return 'WARNING', "Exportación cancelada"
+            if results[0]["error"]:
+                return 'ERROR', f"❌ Error exportando {plan['ruta']}: {results[0]['error']}"
+            return 'INFO', f"✅ Exportación completada: {plan['ruta']}"
+
+        label = os.path.basename(plan["ruta"])
+        started = export_queue.start_queue(
+            [export_queue.LocalJob(label, lambda: OBJECT_OT_buildings_export_fbx.exportar_plan(plan))],
+            on_finish=on_finish,
+        )
+        if not started:
+            self.report({'ERROR'}, "No se pudo iniciar la cola de exportación")
+            return {'CANCELLED'}
         return {'FINISHED'}
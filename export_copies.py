@@ -0,0 +1,120 @@
+import bpy
+from contextlib import contextmanager
+from mathutils import Matrix
+
+
+# ==============================================================
+#   COPIAS TEMPORALES PARA EXPORTAR
+# ==============================================================
+# El FBX se escribe desde copias evaluadas (modificadores aplicados) sin
+# materiales, enlazadas en una colección temporal. La geometría, los
+# materiales y las transformaciones de los originales no se tocan.
+#
+# Lo único que cambia mientras dura la exportación es el nombre: el FBX toma
+# los nombres de objeto y malla de las copias, y en Blender dos ID no pueden
+# llamarse igual, así que los originales pasan a __exp_obj_i / __exp_mesh_i
+# para que las copias salgan con los nombres de siempre. Eso genera updates
+# de renombrado en el depsgraph; los nombres se restauran en el finally
+# (cada paso por separado) aunque el exportador falle.
+#
+# Objetos sin modificadores que comparten malla comparten también la copia,
+# así el FBX conserva la instancia. Con modificadores, o con
+# apply_transform=True (la rotación y escala se hornean por objeto), cada
+# objeto lleva su propia malla y las instancias se pierden.
+
+TEMP_COLLECTION_NAME = "__map_tools_export_tmp"
+
+
+def select_only(objects):
+    """Deja seleccionados solo estos objetos (y el primero como activo)."""
+    for obj in bpy.context.view_layer.objects:
+        if obj.select_get():
+            obj.select_set(False)
+    for obj in objects:
+        obj.select_set(True)
+    if objects:
+        bpy.context.view_layer.objects.active = objects[0]
+
+
+def _bake_rotation_scale(copy, matrix_world):
+    """Equivalente a transform_apply(location=False, rotation=True, scale=True) sobre la copia."""
+    basis = matrix_world.to_3x3()
+    copy.data.transform(basis.to_4x4())
+    if basis.determinant() < 0:
+        copy.data.flip_normals()
+    copy.matrix_world = Matrix.Translation(matrix_world.translation)
+
+
+def evaluated_mesh(obj, depsgraph):
+    """Malla evaluada y sin materiales para exportar (nueva: la borra quien la usa)."""
+    mesh = bpy.data.meshes.new_from_object(
+        obj.evaluated_get(depsgraph), preserve_all_data_layers=True, depsgraph=depsgraph
+    )
+    mesh.materials.clear()
+    return mesh
+
+
+@contextmanager
+def export_copies(objects, depsgraph=None, apply_transform=False):
+    """
+    Context manager: devuelve una copia temporal por objeto, con la malla
+    evaluada, sin materiales y con la misma matrix_world.
+    apply_transform=True hornea rotación y escala en la malla de la copia.
+    """
+    depsgraph = depsgraph or bpy.context.evaluated_depsgraph_get()
+
+    temp_collection = bpy.data.collections.new(TEMP_COLLECTION_NAME)
+    bpy.context.scene.collection.children.link(temp_collection)
+
+    renamed_objects = []
+    renamed_meshes = {}
+    shared_meshes = {}
+    copies = []
+    try:
+        for i, obj in enumerate(objects):
+            key = obj.data.as_pointer()
+            shareable = not apply_transform and not obj.modifiers
+            mesh = shared_meshes.get(key) if shareable else None
+            if mesh is None:
+                mesh = evaluated_mesh(obj, depsgraph)
+                if shareable:
+                    shared_meshes[key] = mesh
+
+            # Liberar el nombre de la malla original (una vez por malla compartida)
+            if key not in renamed_meshes:
+                renamed_meshes[key] = (obj.data, obj.data.name)
+                obj.data.name = f"__exp_mesh_{i}"
+                mesh.name = renamed_meshes[key][1]
+
+            original_name = obj.name
+            obj.name = f"__exp_obj_{i}"
+            renamed_objects.append((obj, original_name))
+
+            copy = bpy.data.objects.new(original_name, mesh)
+            if apply_transform:
+                _bake_rotation_scale(copy, obj.matrix_world)
+            else:
+                copy.matrix_world = obj.matrix_world
+            temp_collection.objects.link(copy)
+            copies.append(copy)
+
+        yield copies
+
+    finally:
+        try:
+            for copy in copies:
+                mesh = copy.data
+                bpy.data.objects.remove(copy, do_unlink=True)
+                if mesh.users == 0:
+                    bpy.data.meshes.remove(mesh)
+        finally:
+            # Los nombres se restauran aunque falle la limpieza de las copias
+            try:
+                for obj, name in renamed_objects:
+                    obj.name = name
+            finally:
+                try:
+                    for mesh, name in renamed_meshes.values():
+                        mesh.name = name
+                finally:
+                    bpy.data.collections.remove(temp_collection)
@@ -1,79 +1,268 @@
 import bpy
 import os
+import tempfile
+import time
+
+from .export_copies import export_copies, select_only
+from .export_manifest import collection_hash, is_up_to_date, load_manifest, record_export, save_manifest
+from .export_scan import ExportScan, estimate_seconds, record_throughput
+
+EXPORT_OPTIONS = {
+    "check_existing": True,
+    "use_selection": True,
+    "global_scale": 1,
+    "apply_unit_scale": True,
+    "apply_scale_options": 'FBX_SCALE_NONE',
+    "use_space_transform": True,
+    "bake_space_transform": True,
+    "object_types": {'MESH'},
+    "use_mesh_modifiers": True,
+    "mesh_smooth_type": 'EDGE',
+    "path_mode": 'AUTO',
+    "axis_forward": '-Z',
+    "axis_up": 'Y'
+}
+
+
+def get_export_collections(main_collection):
+    """La colección activa o, si tiene hijas, cada una de sus hijas."""
+    if not main_collection.children:
+        return [main_collection]
+    return list(main_collection.children)
+
+
+def get_valid_meshes(collection):
+    return [
+        obj for obj in collection.objects
+        if obj.type == 'MESH'
+        and obj.data is not None
+        and hasattr(obj.data, "vertices")
+        and len(obj.data.vertices) > 0
+    ]
+
+
+def get_export_filename(collection, export_path):
+    return os.path.join(export_path, collection.name + ".fbx")
+
+
+def export_collection(collection, export_path):
+    """
+    Exporta las mallas con vértices de la colección a <export_path>/<colección>.fbx.
+    Devuelve la ruta del FBX o None si no había mallas válidas.
+    """
+    objetos_validos = get_valid_meshes(collection)
+
+    if not objetos_validos:
+        print(f"⛔ Colección '{collection.name}' vacía o sin mallas válidas. No se exporta.")
+        return None
+
+    export_filename = get_export_filename(collection, export_path)
+
+    # 🧹 Exportar desde copias evaluadas sin materiales (los originales no se tocan)
+    with export_copies(objetos_validos) as copias:
+        select_only(copias)
+        bpy.ops.export_scene.fbx(filepath=export_filename, **EXPORT_OPTIONS)
+
+    print(f"✅ Exportado: {export_filename}")
+    return export_filename
+
+
+def plan_export(collections, export_path, force=False):
+    """
+    Escanea las colecciones en una pasada, descarta las vacías, avisa de mallas
+    degeneradas y separa las que hay que exportar de las que no cambiaron
+    desde la última exportación (según el manifest). Incluye una estimación
+    de tamaño y tiempo de lo pendiente.
+    """
+    manifest = load_manifest(export_path)
+    scan = ExportScan(collections)
+    digests = {}
+    pending = []
+    empty = []
+    warnings = []
+    estimated_bytes = 0
+    for ci, collection in enumerate(scan.collections):
+        for warning in scan.warnings(ci):
+            print(f"⚠ {collection.name}: {warning}")
+            warnings.append(f"{collection.name}: {warning}")
+
+        objetos_validos = scan.valid_objects(ci)
+        if not objetos_validos:
+            print(f"⛔ Colección '{collection.name}' vacía o sin mallas válidas. No se exporta.")
+            empty.append(collection.name)
+            continue
+
+        digest = collection_hash(objetos_validos, EXPORT_OPTIONS)
+        if not force and is_up_to_date(manifest, get_export_filename(collection, export_path), digest):
+            print(f"⏭ Colección '{collection.name}' sin cambios. No se exporta.")
+            continue
+        digests[collection.name] = digest
+        pending.append(collection.name)
+        estimated_bytes += scan.estimated_bytes(ci)
+
+    estimated_seconds = estimate_seconds(estimated_bytes, manifest)
+    if pending:
+        print(
+            f"📋 {len(pending)} colecciones a exportar: "
+            f"~{estimated_bytes / (1024 * 1024):.1f} MB, ~{estimated_seconds:.1f} s"
+        )
+
+    return {
+        "export_path": export_path,
+        "pending": pending,
+        "skipped": len(collections) - len(pending) - len(empty),
+        "empty": empty,
+        "warnings": warnings,
+        "estimated_bytes": estimated_bytes,
+        "estimated_seconds": estimated_seconds,
+        "manifest": manifest,
+        "digests": digests,
+        "parallel": False,
+        "workers": 0,
+    }
+
+
+def export_pending(collection_names, export_path, parallel=False, workers=0):
+    """Exporta las colecciones (en esta sesión o en workers) y devuelve un resultado por colección."""
+    if parallel:
+        from .export_parallel import run_parallel_export
+        return run_parallel_export(collection_names, export_path, workers=workers)
+
+    results = []
+    for name in collection_names:
+        start = time.perf_counter()
+        result = OBJECT_OT_export_fbx.export_local(name, export_path)
+        result["seconds"] = time.perf_counter() - start
+        results.append(result)
+    return results
+
 
 class OBJECT_OT_export_fbx(bpy.types.Operator):
     bl_idname = "object.export_fbx"
     bl_label = "Export FBX"
     bl_description = "Exporta FBX separando por colecciones usando la colección activa, solo si las mallas tienen vértices"
 
-    def execute(self, context):
-        export_path = context.scene.export_folder
+    def plan(self, context):
+        """
+        Resuelve carpeta y colecciones a exportar (saltando las que no cambiaron).
+        Devuelve un dict con el plan o None si hay un error (ya reportado).
+        """
+        export_path = bpy.path.abspath(context.scene.export_folder)
 
         if not os.path.exists(export_path):
             self.report({'ERROR'}, "La carpeta seleccionada no existe")
-            return {'CANCELLED'}
+            return None
 
         main_collection = bpy.context.view_layer.active_layer_collection.collection
+        plan = plan_export(
+            get_export_collections(main_collection),
+            export_path,
+            force=getattr(context.scene, "export_force", False),
+        )
+        plan["parallel"] = getattr(context.scene, "export_parallel", False) and len(plan["pending"]) > 1
+        plan["workers"] = getattr(context.scene, "export_workers", 0)
+        return plan
 
-        export_options = {
-            "check_existing": True,
-            "use_selection": True,
-            "global_scale": 1,
-            "apply_unit_scale": True,
-            "apply_scale_options": 'FBX_SCALE_NONE',
-            "use_space_transform": True,
-            "bake_space_transform": True,
-            "object_types": {'MESH'},
-            "use_mesh_modifiers": True,
-            "mesh_smooth_type": 'EDGE',
-            "path_mode": 'AUTO',
-            "axis_forward": '-Z',
-            "axis_up": 'Y'
+    @staticmethod
+    def export_local(collection_name, export_path):
+        collection = bpy.data.collections.get(collection_name)
+        if collection is None:
+            return {"collection": collection_name, "file": None, "error": "colección no encontrada"}
+        # Hash de lo que se escribe ahora: desde la cola, la escena pudo cambiar tras el plan
+        digest = collection_hash(get_valid_meshes(collection), EXPORT_OPTIONS)
+        return {
+            "collection": collection_name,
+            "file": export_collection(collection, export_path),
+            "error": None,
+            "digest": digest,
         }
 
-        # 🔒 Backup de materiales
-        material_backup = {}
+    @staticmethod
+    def summarize(plan, results, cancelled=False):
+        """Actualiza el manifest con lo exportado y devuelve (nivel, mensaje) para el report."""
+        manifest = plan["manifest"]
+        errores = [r for r in results if r["error"]]
+        written_bytes = 0
+        written_seconds = 0.0
+        for r in results:
+            estado = f"❌ {r['error']}" if r["error"] else (r["file"] or "sin mallas válidas")
+            print(f"[export_fbx] {r['collection']}: {r.get('seconds', 0.0):.2f} s → {estado}")
+            if r["file"] and not r["error"]:
+                # Los workers exportan el snapshot del plan: para ellos vale el hash del plan
+                record_export(manifest, r["file"], r.get("digest") or plan["digests"][r["collection"]])
+                if os.path.exists(r["file"]):
+                    written_bytes += os.path.getsize(r["file"])
+                    written_seconds += r.get("seconds", 0.0)
+        # Afinar la estimación de tiempo de las próximas exportaciones
+        record_throughput(manifest, written_bytes, written_seconds)
+        save_manifest(plan["export_path"], manifest)
 
-        def export_collection(collection):
-            objetos_validos = [
-                obj for obj in collection.objects
-                if obj.type == 'MESH'
-                and obj.data is not None
-                and hasattr(obj.data, "vertices")
-                and len(obj.data.vertices) > 0
-            ]
+        resumen = f"{len(results)} exportadas, {plan['skipped']} sin cambios"
+        if plan.get("empty"):
+            resumen += f", {len(plan['empty'])} vacías"
+        if plan.get("warnings"):
+            resumen += f", {len(plan['warnings'])} avisos"
+        if cancelled:
+            return 'WARNING', f"Exportación cancelada ({resumen})"
+        if errores:
+            return 'WARNING', f"Exportación con {len(errores)} errores ({resumen}, ver consola)"
+        return 'INFO', f"Exportación completada ({resumen})"
 
-            if not objetos_validos:
-                print(f"⛔ Colección '{collection.name}' vacía o sin mallas válidas. No se exporta.")
-                return
-
-            bpy.ops.object.select_all(action='DESELECT')
+    def execute(self, context):
+        plan = self.plan(context)
+        if plan is None:
+            return {'CANCELLED'}
 
-            for obj in objetos_validos:
-                obj.select_set(True)
+        # Exportar la colección activa o sus hijas
+        results = export_pending(plan["pending"], plan["export_path"], plan["parallel"], plan["workers"])
 
-                # 📦 Guardar materiales (manteniendo orden y slots vacíos)
-                material_backup[obj.name] = list(obj.data.materials)
+        level, message = self.summarize(plan, results)
+        self.report({level}, message)
+        return {'FINISHED'}
 
-                # 🧹 Limpiar materiales para export
-                obj.data.materials.clear()
+    def invoke(self, context, event):
+        # Desde la interfaz: cola modal con progreso y cancelación (Esc)
+        from . import export_queue
 
-            export_filename = os.path.join(export_path, collection.name + ".fbx")
-            bpy.ops.export_scene.fbx(filepath=export_filename, **export_options)
-            print(f"✅ Exportado: {export_filename}")
+        if export_queue.is_running():
+            self.report({'ERROR'}, "Ya hay una exportación en curso")
+            return {'CANCELLED'}
 
-            # 🔁 Restaurar materiales
-            for obj in objetos_validos:
-                mats = material_backup.get(obj.name, [])
-                for mat in mats:
-                    obj.data.materials.append(mat)
+        plan = self.plan(context)
+        if plan is None:
+            return {'CANCELLED'}
+        if not plan["pending"]:
+            self.report({'INFO'}, f"Nada que exportar ({plan['skipped']} sin cambios, {len(plan['empty'])} vacías)")
+            return {'FINISHED'}
 
-        # Exportar la colección activa o sus hijas
-        if not main_collection.children:
-            export_collection(main_collection)
+        export_path = plan["export_path"]
+        if plan["parallel"]:
+            from .export_parallel import default_workers, save_snapshot, split_batches
+            temp_dir = tempfile.mkdtemp(prefix="map_tools_export_")
+            snapshot = save_snapshot(temp_dir)
+            # Un proceso por lote: cada uno carga el snapshot una sola vez
+            batches = split_batches(plan["pending"], plan["workers"] or default_workers())
+            jobs = [
+                export_queue.WorkerJob(snapshot, batch, export_path, os.path.join(temp_dir, f"result_{i:04d}.json"))
+                for i, batch in enumerate(batches)
+            ]
+            concurrency = len(jobs)
         else:
-            for sub_collection in main_collection.children:
-                export_collection(sub_collection)
+            temp_dir = None
+            jobs = [
+                export_queue.LocalJob(name, lambda name=name: OBJECT_OT_export_fbx.export_local(name, export_path))
+                for name in plan["pending"]
+            ]
+            concurrency = 1
 
-        self.report({'INFO'}, "Exportación completada")
+        started = export_queue.start_queue(
+            jobs,
+            concurrency=concurrency,
+            # El operador ya habrá terminado: usar la clase, no self
+            on_finish=lambda results, cancelled: OBJECT_OT_export_fbx.summarize(plan, results, cancelled),
+            temp_dir=temp_dir,
+        )
+        if not started:
+            self.report({'ERROR'}, "No se pudo iniciar la cola de exportación")
+            return {'CANCELLED'}
         return {'FINISHED'}
@@ -0,0 +1,183 @@
+import bpy
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+# Sidecar JSON dentro de la carpeta de exportación
+MANIFEST_NAME = ".map_tools_export_manifest.json"
+MANIFEST_VERSION = 1
+
+
+# ==============================================================
+#   HASH DE CONTENIDO
+# ==============================================================
+
+# Campo de foreach_get, componentes por elemento y dtype, por tipo de atributo
+_ATTRIBUTE_LAYOUT = {
+    'FLOAT': ("value", 1, np.float32),
+    'INT': ("value", 1, np.int32),
+    'INT8': ("value", 1, np.int32),
+    'BOOLEAN': ("value", 1, np.bool_),
+    'FLOAT_VECTOR': ("vector", 3, np.float32),
+    'FLOAT2': ("vector", 2, np.float32),
+    'INT16_2D': ("value", 2, np.int32),
+    'INT32_2D': ("value", 2, np.int32),
+    'FLOAT_COLOR': ("color", 4, np.float32),
+    'BYTE_COLOR': ("color", 4, np.float32),
+    'QUATERNION': ("value", 4, np.float32),
+    'FLOAT4X4': ("value", 16, np.float32),
+}
+
+# Propiedades de modificadores que solo afectan a la interfaz
+_UI_PROPERTIES = {"show_expanded", "is_active", "show_in_editmode", "show_on_cage", "use_pin_to_last"}
+
+
+def _hash_attribute(h, attribute):
+    h.update(f"{attribute.name}|{attribute.domain}|{attribute.data_type}".encode())
+    layout = _ATTRIBUTE_LAYOUT.get(attribute.data_type)
+    if layout is None:
+        # STRING y tipos nuevos: valor por valor
+        h.update(repr([_plain(getattr(item, "value", None)) for item in attribute.data]).encode())
+        return
+    field, components, dtype = layout
+    values = np.empty(len(attribute.data) * components, dtype=dtype)
+    attribute.data.foreach_get(field, values)
+    h.update(values.tobytes())
+
+
+def hash_mesh(h, mesh):
+    """
+    Topología y todos los atributos que llegan al FBX: posiciones, UVs,
+    sharp_edge/sharp_face, índices de material, normales personalizadas,
+    colores... más los nombres de los materiales de la malla.
+    """
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    h.update(loop_totals.tobytes())
+
+    loop_verts = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loop_verts)
+    h.update(loop_verts.tobytes())
+
+    edge_verts = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edge_verts)
+    h.update(edge_verts.tobytes())
+
+    # Incluye "position"; los internos (".select_vert", ".hide_poly"...) no se exportan
+    for attribute in sorted(mesh.attributes, key=lambda a: a.name):
+        if not attribute.name.startswith("."):
+            _hash_attribute(h, attribute)
+
+    if mesh.has_custom_normals:
+        normals = np.empty(len(mesh.loops) * 3, dtype=np.float32)
+        mesh.corner_normals.foreach_get("vector", normals)
+        h.update(normals.tobytes())
+
+    h.update(repr([mat.name if mat else "" for mat in mesh.materials]).encode())
+
+
+def _plain(value):
+    """Valor serializable y estable entre sesiones (sin direcciones de memoria)."""
+    if isinstance(value, bpy.types.ID):
+        return value.name
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if hasattr(value, "to_dict"):
+        return {k: _plain(v) for k, v in value.to_dict().items()}
+    if hasattr(value, "to_list"):
+        return _plain(value.to_list())
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    try:
+        return [_plain(v) for v in value]
+    except TypeError:
+        return str(value)
+
+
+def _rna_values(struct):
+    """Valores de todas las propiedades RNA editables (los ID por nombre)."""
+    values = []
+    for prop in struct.bl_rna.properties:
+        ident = prop.identifier
+        if prop.is_readonly or ident in _UI_PROPERTIES or ident.startswith("open_"):
+            continue
+        if prop.type == 'COLLECTION':
+            continue
+        value = getattr(struct, ident)
+        if prop.type == 'POINTER' and not isinstance(value, bpy.types.ID):
+            # Structs anidados (perfiles, etc.): no son datos referenciados
+            continue
+        values.append((ident, _plain(value)))
+    return values
+
+
+def hash_modifiers(h, obj):
+    # use_mesh_modifiers=True: la pila forma parte del resultado exportado
+    for mod in obj.modifiers:
+        h.update(f"{mod.name}|{mod.type}".encode())
+        h.update(json.dumps(_rna_values(mod), default=str).encode())
+        if mod.type == 'NODES':
+            # Entradas del node group (propiedades ID del modificador)
+            inputs = {key: _plain(mod[key]) for key in mod.keys()}
+            h.update(json.dumps(inputs, sort_keys=True, default=str).encode())
+
+
+def collection_hash(objects, export_options):
+    """
+    Hash de lo que se va a exportar: nombres, transformaciones, materiales,
+    topología y atributos de la malla (foreach_get), parámetros de toda la
+    pila de modificadores y opciones de exportación. Los cambios dentro de
+    un node group o en objetos referenciados por modificadores no se
+    detectan: usar "Forzar".
+    """
+    h = hashlib.sha1()
+    h.update(repr(sorted((k, repr(v)) for k, v in export_options.items())).encode())
+
+    for obj in sorted(objects, key=lambda o: o.name):
+        h.update(obj.name.encode())
+        h.update(np.array(obj.matrix_world, dtype=np.float32).tobytes())
+        # Materiales por slot (incluye los enlazados al objeto)
+        h.update(repr([(slot.link, slot.material.name if slot.material else "") for slot in obj.material_slots]).encode())
+        if obj.type == 'MESH' and obj.data is not None:
+            hash_mesh(h, obj.data)
+        hash_modifiers(h, obj)
+
+    return h.hexdigest()
+
+
+# ==============================================================
+#   MANIFEST
+# ==============================================================
+
+def load_manifest(export_folder):
+    path = os.path.join(export_folder, MANIFEST_NAME)
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"version": MANIFEST_VERSION, "files": {}}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "files": {}}
+    return manifest
+
+
+def save_manifest(export_folder, manifest):
+    path = os.path.join(export_folder, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def is_up_to_date(manifest, fbx_path, digest):
+    entry = manifest["files"].get(os.path.basename(fbx_path))
+    return bool(entry) and entry.get("hash") == digest and os.path.exists(fbx_path)
+
+
+def record_export(manifest, fbx_path, digest):
+    manifest["files"][os.path.basename(fbx_path)] = {"hash": digest, "exported": time.time()}
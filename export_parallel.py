@@ -0,0 +1,115 @@
+import bpy
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Script que ejecuta cada proceso "blender --background"
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fbx_export_worker.py")
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def save_snapshot(temp_dir):
+    """Copia del estado actual de la escena (sin cambiar el archivo abierto)."""
+    snapshot = os.path.join(temp_dir, "snapshot.blend")
+    bpy.ops.wm.save_as_mainfile(filepath=snapshot, copy=True, compress=False)
+    return snapshot
+
+
+def split_batches(collection_names, workers):
+    """Reparte las colecciones en como mucho `workers` lotes (round-robin)."""
+    workers = max(1, min(workers, len(collection_names)))
+    return [list(collection_names[i::workers]) for i in range(workers) if collection_names[i::workers]]
+
+
+def write_jobs(jobs_path, collection_names, export_path):
+    with open(jobs_path, "w", encoding="utf-8") as f:
+        json.dump({"jobs": [{"collection": name, "output": export_path} for name in collection_names]}, f)
+    return jobs_path
+
+
+def start_worker(snapshot, jobs_path, result_path):
+    """Lanza un proceso worker para un lote de colecciones sin esperar (subprocess.Popen)."""
+    cmd = [
+        bpy.app.binary_path,
+        "--background",
+        "--factory-startup",
+        snapshot,
+        "--python", WORKER_SCRIPT,
+        "--",
+        "--jobs", jobs_path,
+        "--result", result_path,
+    ]
+    # Salida a un log (un PIPE sin leer puede bloquear al worker)
+    with open(result_path + ".log", "w", encoding="utf-8") as log:
+        return subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+
+
+def collect_worker(proc, collection_names, result_path, wall):
+    """
+    Lee el resumen JSON de un worker ya terminado. Devuelve un resultado por
+    colección del lote; las que el worker no llegó a exportar llevan error.
+    """
+    done = {}
+    if os.path.exists(result_path):
+        with open(result_path, encoding="utf-8") as f:
+            done = {r["collection"]: r for r in json.load(f)["results"]}
+
+    missing_error = None
+    if len(done) < len(collection_names):
+        # El worker murió antes de terminar el lote
+        try:
+            with open(result_path + ".log", encoding="utf-8", errors="replace") as log:
+                tail = log.read().strip().splitlines()[-5:]
+        except OSError:
+            tail = []
+        missing_error = f"worker terminó con código {proc.returncode}: " + " | ".join(tail)
+
+    results = []
+    for name in collection_names:
+        result = {"collection": name, "file": None, "seconds": 0.0, "error": missing_error}
+        result.update(done.get(name, {}))
+        result["wall_seconds"] = wall
+        results.append(result)
+    return results
+
+
+def _run_worker(snapshot, collection_names, export_path, result_path):
+    start = time.perf_counter()
+    jobs_path = write_jobs(result_path + ".jobs.json", collection_names, export_path)
+    proc = start_worker(snapshot, jobs_path, result_path)
+    proc.wait()
+    return collect_worker(proc, collection_names, result_path, time.perf_counter() - start)
+
+
+def run_parallel_export(collection_names, export_path, workers=0):
+    """
+    Guarda un snapshot temporal de la escena y reparte las colecciones en
+    lotes, uno por proceso Blender en segundo plano: cada proceso carga el
+    snapshot una sola vez y exporta todo su lote.
+    Devuelve una lista de resultados (mismo orden que collection_names) con
+    collection, file, seconds, wall_seconds y error.
+    """
+    workers = workers or default_workers()
+    temp_dir = tempfile.mkdtemp(prefix="map_tools_export_")
+    try:
+        snapshot = save_snapshot(temp_dir)
+        batches = split_batches(collection_names, workers)
+        with ThreadPoolExecutor(max_workers=len(batches) or 1) as pool:
+            futures = [
+                pool.submit(
+                    _run_worker, snapshot, batch, export_path,
+                    os.path.join(temp_dir, f"result_{i:04d}.json"),
+                )
+                for i, batch in enumerate(batches)
+            ]
+            by_name = {r["collection"]: r for future in futures for r in future.result()}
+        return [by_name[name] for name in collection_names]
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
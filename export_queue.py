@@ -0,0 +1,221 @@
+import bpy
+import shutil
+import time
+
+from .export_parallel import collect_worker, start_worker, write_jobs
+
+
+# ==============================================================
+#   TRABAJOS DE EXPORTACIÓN
+# ==============================================================
+
+class LocalJob:
+    """Exporta dentro de la sesión actual (una colección por tick del timer)."""
+
+    def __init__(self, label, func):
+        self.label = label
+        self.func = func
+        self.result = None
+
+    def start(self):
+        start = time.perf_counter()
+        try:
+            self.result = self.func()
+        except Exception as e:
+            self.result = {"collection": self.label, "file": None, "error": str(e)}
+        self.result.setdefault("seconds", time.perf_counter() - start)
+
+    def poll(self):
+        return True
+
+    def cancel(self):
+        pass
+
+
+class WorkerJob:
+    """Exporta un lote de colecciones en un proceso "blender --background" sin bloquear la interfaz."""
+
+    def __init__(self, snapshot, collection_names, export_path, result_path):
+        self.label = ", ".join(collection_names)
+        self.collection_names = list(collection_names)
+        self.snapshot = snapshot
+        self.export_path = export_path
+        self.result_path = result_path
+        self.proc = None
+        self.started = 0.0
+        self.result = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        jobs_path = write_jobs(self.result_path + ".jobs.json", self.collection_names, self.export_path)
+        self.proc = start_worker(self.snapshot, jobs_path, self.result_path)
+
+    def poll(self):
+        if self.proc.poll() is None:
+            return False
+        # Una lista: un resultado por colección del lote
+        self.result = collect_worker(
+            self.proc, self.collection_names, self.result_path, time.perf_counter() - self.started
+        )
+        return True
+
+    def cancel(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.kill()
+            self.proc.wait()
+
+
+# ==============================================================
+#   COLA
+# ==============================================================
+
+class ExportQueue:
+    def __init__(self, jobs, concurrency=1, on_finish=None, temp_dir=None):
+        self.jobs = list(jobs)
+        self.pending = list(self.jobs)
+        self.running = []
+        self.finished = []
+        self.concurrency = max(1, concurrency)
+        self.on_finish = on_finish
+        self.temp_dir = temp_dir
+        self.cancelled = False
+
+    @property
+    def done(self):
+        return not self.pending and not self.running
+
+    def step(self):
+        for job in list(self.running):
+            if job.poll():
+                self.running.remove(job)
+                self.finished.append(job)
+
+        while self.pending and len(self.running) < self.concurrency:
+            job = self.pending.pop(0)
+            job.start()
+            if job.poll():
+                self.finished.append(job)
+                # Los trabajos locales bloquean: uno por tick para devolver el control a la UI
+                break
+            self.running.append(job)
+
+    def cancel(self):
+        self.cancelled = True
+        self.pending.clear()
+        for job in self.running:
+            job.cancel()
+        self.running.clear()
+
+    def results(self):
+        # Mismo orden en que se encolaron (los lotes aportan un resultado por colección)
+        order = {id(job): i for i, job in enumerate(self.jobs)}
+        results = []
+        for job in sorted(self.finished, key=lambda j: order[id(j)]):
+            if isinstance(job.result, list):
+                results.extend(job.result)
+            else:
+                results.append(job.result)
+        return results
+
+    def finish(self):
+        message = None
+        try:
+            if self.on_finish:
+                message = self.on_finish(self.results(), self.cancelled)
+        finally:
+            if self.temp_dir:
+                shutil.rmtree(self.temp_dir, ignore_errors=True)
+        return message
+
+
+_active_queue = None
+
+
+def is_running():
+    return _active_queue is not None
+
+
+def start_queue(jobs, concurrency=1, on_finish=None, temp_dir=None):
+    """
+    Encola los trabajos y lanza el operador modal que los procesa.
+    on_finish(results, cancelled) puede devolver (nivel, mensaje) para el report.
+    Devuelve False si el operador modal no llegó a arrancar.
+    """
+    global _active_queue
+    queue = ExportQueue(jobs, concurrency, on_finish, temp_dir)
+    _active_queue = queue
+    started = False
+    try:
+        started = 'RUNNING_MODAL' in bpy.ops.object.export_queue('INVOKE_DEFAULT')
+    finally:
+        if not started and _active_queue is queue:
+            # El operador no arrancó: liberar la cola (y su carpeta temporal)
+            # para no bloquear las siguientes exportaciones
+            _active_queue = None
+            queue.cancel()
+            queue.finish()
+    return started
+
+
+class OBJECT_OT_export_queue(bpy.types.Operator):
+    bl_idname = "object.export_queue"
+    bl_label = "Cola de exportación"
+    bl_description = "Procesa la cola de exportación sin bloquear la interfaz (Esc para cancelar)"
+
+    _timer = None
+    _last_tick = -1.0
+
+    def invoke(self, context, event):
+        if _active_queue is None:
+            return {'CANCELLED'}
+
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.1, window=context.window)
+        wm.modal_handler_add(self)
+        wm.progress_begin(0, len(_active_queue.jobs))
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        queue = _active_queue
+
+        if event.type == 'ESC' and event.value == 'PRESS':
+            queue.cancel()
+            return self.finish(context)
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+        # El evento no dice de qué timer viene: solo avanzar cuando el propio
+        # ha vuelto a saltar (los timers de otros add-ons no aceleran la cola)
+        if self._timer.time_duration == self._last_tick:
+            return {'PASS_THROUGH'}
+        self._last_tick = self._timer.time_duration
+
+        queue.step()
+
+        total = len(queue.jobs)
+        done = len(queue.finished)
+        context.window_manager.progress_update(done)
+        current = ", ".join(job.label for job in queue.running) or "..."
+        context.workspace.status_text_set(f"Exportando {done}/{total}: {current}  (Esc para cancelar)")
+
+        if queue.done:
+            return self.finish(context)
+        return {'PASS_THROUGH'}
+
+    def finish(self, context):
+        global _active_queue
+        queue = _active_queue
+        _active_queue = None
+
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+
+        message = queue.finish()
+        if message:
+            self.report({message[0]}, message[1])
+        elif queue.cancelled:
+            self.report({'WARNING'}, "Exportación cancelada")
+
+        return {'CANCELLED'} if queue.cancelled else {'FINISHED'}
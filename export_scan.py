@@ -0,0 +1,104 @@
+import numpy as np
+
+
+# ==============================================================
+#   ESCANEO PREVIO A LA EXPORTACIÓN
+# ==============================================================
+# Una sola pasada por las colecciones a exportar recoge en una tabla compacta
+# (array estructurado de numpy, una fila por objeto malla) el número de
+# vértices, caras y loops, las dimensiones y los modificadores. Con esa tabla
+# se descartan las colecciones vacías, se avisa de mallas degeneradas y se
+# estima el tamaño y el tiempo de la exportación antes de escribir nada.
+
+SCAN_DTYPE = np.dtype([
+    ("collection", np.int32),
+    ("vertices", np.int64),
+    ("polygons", np.int64),
+    ("loops", np.int64),
+    ("modifiers", np.int32),
+    ("dimensions", np.float32, 3),
+])
+
+# Por debajo de esto un eje se considera aplastado
+DEGENERATE_EPSILON = 1e-5
+
+# Tamaño aproximado en el FBX: coordenadas por vértice; índice, normal y UV por loop
+BYTES_PER_VERTEX = 24
+BYTES_PER_LOOP = 4 + 24 + 16
+BYTES_PER_OBJECT = 4096
+
+# Velocidad de exportación supuesta hasta que el manifest tenga una medida real
+DEFAULT_BYTES_PER_SECOND = 8 * 1024 * 1024
+
+
+class ExportScan:
+    def __init__(self, collections):
+        self.collections = list(collections)
+        self.objects = []
+        rows = []
+        for ci, collection in enumerate(self.collections):
+            for obj in collection.objects:
+                if obj.type != 'MESH':
+                    continue
+                mesh = obj.data
+                if mesh is None or not hasattr(mesh, "vertices"):
+                    continue
+                self.objects.append(obj)
+                rows.append((
+                    ci,
+                    len(mesh.vertices),
+                    len(mesh.polygons),
+                    len(mesh.loops),
+                    len(obj.modifiers),
+                    tuple(obj.dimensions),
+                ))
+        self.table = np.array(rows, dtype=SCAN_DTYPE)
+
+    def _rows(self, ci):
+        return np.flatnonzero((self.table["collection"] == ci) & (self.table["vertices"] > 0))
+
+    def valid_objects(self, ci):
+        """Mallas con vértices de la colección ci (mismo criterio que get_valid_meshes)."""
+        return [self.objects[i] for i in self._rows(ci)]
+
+    def estimated_bytes(self, ci):
+        rows = self.table[self._rows(ci)]
+        return int(
+            rows["vertices"].sum() * BYTES_PER_VERTEX
+            + rows["loops"].sum() * BYTES_PER_LOOP
+            + len(rows) * BYTES_PER_OBJECT
+        )
+
+    def warnings(self, ci):
+        """Avisos de mallas degeneradas o que no se exportarán de la colección ci."""
+        mask = self.table["collection"] == ci
+        rows = self.table[mask]
+        names = [self.objects[i].name for i in np.flatnonzero(mask)]
+
+        # Dos o más ejes aplastados: la malla es una línea o un punto
+        flat_axes = (np.abs(rows["dimensions"]) < DEGENERATE_EPSILON).sum(axis=1)
+        has_vertices = rows["vertices"] > 0
+
+        warnings = []
+        for i in np.flatnonzero(~has_vertices & (rows["modifiers"] > 0)):
+            warnings.append(f"{names[i]}: malla base sin vértices (tiene modificadores), no se exporta")
+        for i in np.flatnonzero(has_vertices & (rows["polygons"] == 0)):
+            warnings.append(f"{names[i]}: malla sin caras")
+        for i in np.flatnonzero(has_vertices & (rows["polygons"] > 0) & (flat_axes >= 2)):
+            warnings.append(f"{names[i]}: tamaño casi nulo ({rows['dimensions'][i].round(6).tolist()})")
+        return warnings
+
+
+def estimate_seconds(total_bytes, manifest):
+    """Tiempo estimado con la velocidad medida en exportaciones anteriores."""
+    rate = manifest.get("bytes_per_second") or DEFAULT_BYTES_PER_SECOND
+    return total_bytes / rate
+
+
+def record_throughput(manifest, total_bytes, seconds):
+    """Media móvil de la velocidad real de exportación (bytes escritos / segundo)."""
+    if total_bytes <= 0 or seconds <= 0:
+        return
+    rate = total_bytes / seconds
+    previous = manifest.get("bytes_per_second")
+    manifest["bytes_per_second"] = rate if not previous else 0.7 * previous + 0.3 * rate
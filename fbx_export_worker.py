@@ -0,0 +1,96 @@
+# Worker de exportación FBX para "blender --background".
+#
+#   blender --background --factory-startup snapshot.blend --python fbx_export_worker.py -- \
+#       --jobs trabajos.json --result resultado.json
+#
+# El snapshot se carga una sola vez y se exportan todas las colecciones del
+# lote con export_fbx.export_collection. El archivo de trabajos (o "-" para
+# leerlo de stdin) es un JSON:
+#
+#   {"jobs": [{"collection": "NOMBRE", "output": "CARPETA"}, ...]}
+#
+# El resultado es un JSON {"results": [{collection, file, seconds, error}, ...],
+# "seconds": total} que se reescribe tras cada colección, de modo que si el
+# proceso muere a mitad del lote se conservan las ya exportadas.
+#
+# Para una sola colección sigue valiendo:
+#       --collection NOMBRE --output CARPETA --result resultado.json
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+import traceback
+
+import bpy
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(ADDON_DIR))
+export_fbx = importlib.import_module(os.path.basename(ADDON_DIR) + ".export_fbx")
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="fbx_export_worker")
+    parser.add_argument("--jobs", help="JSON con la lista de trabajos ('-' para stdin)")
+    parser.add_argument("--collection")
+    parser.add_argument("--output")
+    parser.add_argument("--result", required=True)
+    args = parser.parse_args(argv)
+    if not args.jobs and not (args.collection and args.output):
+        parser.error("indica --jobs o --collection y --output")
+    return args
+
+
+def load_jobs(args):
+    if not args.jobs:
+        return [{"collection": args.collection, "output": args.output}]
+    if args.jobs == "-":
+        return json.load(sys.stdin)["jobs"]
+    with open(args.jobs, encoding="utf-8") as f:
+        return json.load(f)["jobs"]
+
+
+def run_job(job):
+    result = {"collection": job["collection"], "file": None, "seconds": 0.0, "error": None}
+
+    start = time.perf_counter()
+    try:
+        collection = bpy.data.collections.get(job["collection"])
+        if collection is None:
+            result["error"] = "colección no encontrada"
+        else:
+            result["file"] = export_fbx.export_collection(collection, job["output"])
+    except Exception:
+        result["error"] = traceback.format_exc().strip().splitlines()[-1]
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def write_summary(path, results, seconds):
+    # Escritura atómica: el proceso que lee nunca ve un JSON a medias
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"results": results, "seconds": seconds}, f)
+    os.replace(temp_path, path)
+
+
+def main():
+    args = parse_args()
+    jobs = load_jobs(args)
+
+    start = time.perf_counter()
+    results = []
+    for job in jobs:
+        results.append(run_job(job))
+        write_summary(args.result, results, time.perf_counter() - start)
+
+    if not jobs:
+        write_summary(args.result, results, 0.0)
+
+    sys.exit(1 if any(r["error"] for r in results) else 0)
+
+
+main()
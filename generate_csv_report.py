@@ -1,6 +1,238 @@
 import bpy
 import csv
+import numpy as np
 from mathutils import Vector
+from mathutils.bvhtree import BVHTree
+
+from .spatial_index import SpatialGrid
+
+ENTRY_EXPANSION = Vector((0.05, 0.05, 0.05))
+COLLECTIONS_PREFIXES = ["CHS", "Walls", "Pubs", "Apts"]
+
+
+def get_base_name(name):
+    return name.split(".")[0]
+
+
+# =========================================================
+#     ETAPA 1 – DICCIONARIO NOMBRE BASE → TIPO
+# =========================================================
+
+def build_type_lookup():
+    """
+    Un solo recorrido de las colecciones CHS/Walls/Pubs/Apts.
+    Respeta la prioridad anterior: gana el primer prefijo de la lista.
+    """
+    type_by_base_name = {}
+    for collection_prefix in COLLECTIONS_PREFIXES:
+        for collection in bpy.data.collections:
+            if collection.name.startswith(collection_prefix):
+                for obj in collection.objects:
+                    type_by_base_name.setdefault(get_base_name(obj.name), collection_prefix)
+    return type_by_base_name
+
+
+# =========================================================
+#     ETAPA 2 – EDIFICIO → FACHADAS → LETRA
+# =========================================================
+
+def assign_facades_and_letters(buildings):
+    """
+    Join espacial: fachadas dentro de cada edificio y primera letra dentro
+    de cada fachada. Devuelve ({edificio: [fachadas]}, {fachada: nomenclatura}).
+    """
+    facades_collection = bpy.data.collections.get("Facades_Exp")
+    if not facades_collection:
+        return None, {}
+
+    facades_grid = SpatialGrid(f for f in facades_collection.objects if f.type == 'MESH')
+    facades_by_building = {
+        building.as_pointer(): facades_grid.query_volume(building, ENTRY_EXPANSION)
+        for building in buildings
+    }
+
+    nomenclature_by_facade = {}
+    letters_collection = bpy.data.collections.get("Letters_Exp")
+    if letters_collection:
+        letters_grid = SpatialGrid(l for l in letters_collection.objects if l.type == 'MESH')
+        for facades in facades_by_building.values():
+            for facade in facades:
+                key = facade.as_pointer()
+                if key in nomenclature_by_facade:
+                    continue
+                letters = letters_grid.query_volume(facade, ENTRY_EXPANSION)
+                nomenclature_by_facade[key] = letters[0].name.split('.')[0] if letters else None
+
+    return facades_by_building, nomenclature_by_facade
+
+
+# =========================================================
+#     ETAPA 3 – EDIFICIO → BARRIO
+# =========================================================
+
+def build_neighborhood_tree(neighborhoods, depsgraph):
+    """
+    Un único BVHTree en espacio mundo con los triángulos de todos los barrios.
+    Devuelve (tree, offsets): el triángulo i pertenece al barrio
+    neighborhoods[searchsorted(offsets, i, 'right') - 1].
+    """
+    all_verts = []
+    all_tris = []
+    offsets = []
+    vert_count = 0
+    tri_count = 0
+
+    for neighborhood in neighborhoods:
+        offsets.append(tri_count)
+        neighborhood_eval = neighborhood.evaluated_get(depsgraph)
+        try:
+            mesh = neighborhood_eval.to_mesh()
+        except RuntimeError:
+            mesh = None
+        if mesh is None:
+            continue
+
+        mesh.calc_loop_triangles()
+        verts = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+        mesh.vertices.foreach_get("co", verts)
+        tris = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", tris)
+        neighborhood_eval.to_mesh_clear()
+
+        mw = np.array(neighborhood.matrix_world, dtype=np.float64)
+        verts = verts.reshape(-1, 3) @ mw[:3, :3].T + mw[:3, 3]
+
+        all_verts.append(verts)
+        all_tris.append(tris.reshape(-1, 3) + vert_count)
+        vert_count += len(verts)
+        tri_count += len(tris) // 3
+
+    if not tri_count:
+        return None, offsets
+
+    tree = BVHTree.FromPolygons(
+        np.concatenate(all_verts).tolist(),
+        np.concatenate(all_tris).tolist(),
+        all_triangles=True,
+    )
+    return tree, np.array(offsets)
+
+
+def assign_buildings_to_neighborhoods(neighborhoods, buildings, depsgraph):
+    """
+    Ray-cast hacia abajo de todos los orígenes de edificio contra el árbol
+    combinado; cada edificio queda en un solo barrio (el primero que golpea).
+    Devuelve {puntero barrio: [edificios]} en el orden de buildings.
+    """
+    buildings_by_neighborhood = {n.as_pointer(): [] for n in neighborhoods}
+    tree, offsets = build_neighborhood_tree(neighborhoods, depsgraph)
+    if tree is None:
+        return buildings_by_neighborhood
+
+    down = Vector((0, 0, -1))
+    hits = [tree.ray_cast(building.matrix_world.translation, down)[2] for building in buildings]
+    hit_buildings = [b for b, index in zip(buildings, hits) if index is not None]
+    hit_indices = np.array([index for index in hits if index is not None], dtype=np.int64)
+    owners = np.searchsorted(offsets, hit_indices, side='right') - 1
+
+    for building, owner in zip(hit_buildings, owners):
+        buildings_by_neighborhood[neighborhoods[owner].as_pointer()].append(building)
+    return buildings_by_neighborhood
+
+
+def write_csv_report(csv_filepath, depsgraph=None):
+    """
+    Genera el reporte de entradas por edificio y barrio en csv_filepath.
+    Devuelve un resumen (archivo, edificios, entradas por tipo y errores por barrio).
+    """
+    # Obtener el gráfico de evaluación
+    depsgraph = depsgraph or bpy.context.evaluated_depsgraph_get()
+
+    # Inicializar contadores
+    entries_count_by_type = {"CHS": 0, "Walls": 0, "Pubs": 0, "Apts": 0}
+    building_types_by_neighborhood = {}
+    output_data = []
+
+    buildings = [obj for obj in bpy.data.collections["Buildings_Exp"].objects if obj.type == 'MESH']
+
+    # Etapas 1 y 2: se calculan una sola vez para todo el reporte
+    type_by_base_name = build_type_lookup()
+    facades_by_building, nomenclature_by_facade = assign_facades_and_letters(buildings)
+
+    # Etapa 3: cada edificio asignado a un único barrio en un solo lote
+    neighborhoods = [obj for obj in bpy.data.objects if obj.name.startswith("R_BR_")]
+    buildings_by_neighborhood = assign_buildings_to_neighborhoods(neighborhoods, buildings, depsgraph)
+
+    for obj in neighborhoods:
+        neighborhood_name = obj.name[5:]
+        building_types_by_neighborhood[neighborhood_name] = {"1x1": 0, "2x1": 0, "2x2": 0, "Errores": []}
+
+        if facades_by_building is None:
+            continue
+
+        for building in buildings_by_neighborhood[obj.as_pointer()]:
+            facades_inside = facades_by_building[building.as_pointer()]
+            entry_count = len(facades_inside)
+
+            if entry_count == 4:
+                building_types_by_neighborhood[neighborhood_name]["1x1"] += 1
+            elif entry_count == 6:
+                building_types_by_neighborhood[neighborhood_name]["2x1"] += 1
+            elif entry_count == 8:
+                building_types_by_neighborhood[neighborhood_name]["2x2"] += 1
+            else:
+                building_types_by_neighborhood[neighborhood_name]["Errores"].append(building.name)
+
+            # Construir fila para el CSV
+            building_row = [neighborhood_name, building.name]
+            for facade in facades_inside:
+                entry_type = type_by_base_name.get(get_base_name(facade.name), "Desconocido")
+                nomenclature = nomenclature_by_facade.get(facade.as_pointer())
+                building_row.extend([entry_type, facade.name, nomenclature or "N/A"])
+                if entry_type in entries_count_by_type:
+                    entries_count_by_type[entry_type] += 1
+
+            # Rellenar columnas faltantes con "N/A"
+            while len(building_row) < 34:  # Máximo de 10 entradas (3 columnas por entrada)
+                building_row.extend(["N/A", "N/A", "N/A"])
+
+            output_data.append(building_row)
+
+    # Escribir datos en archivo CSV
+    with open(csv_filepath, mode='w', newline='', encoding='utf-8') as csvfile:
+        csv_writer = csv.writer(csvfile)
+
+        # Sección 1: Detalle de edificios y entradas
+        csv_writer.writerow(["Detalle de edificios y entradas"])
+        headers = ["Barrio", "Edificio"]
+        for i in range(1, 11):  # Máximo 10 entradas
+            headers.extend([f"Tipo {i}", f"Nombre {i}", f"Placa {i}"])
+        csv_writer.writerow(headers)
+        for row in output_data:
+            csv_writer.writerow(row)
+
+        # Sección 2: Reporte general de las entradas por tipo
+        csv_writer.writerow([])
+        csv_writer.writerow(["Reporte general de las entradas por tipo"])
+        csv_writer.writerow(["Tipo de Entrada", "Cantidad"])
+        for entry_type, count in entries_count_by_type.items():
+            csv_writer.writerow([entry_type, count])
+
+        # Sección 3: Reporte de edificios por barrios
+        csv_writer.writerow([])
+        csv_writer.writerow(["Reporte de edificios por barrios"])
+        csv_writer.writerow(["Barrio", "1x1", "2x1", "2x2", "Errores"])
+        for neighborhood, types in building_types_by_neighborhood.items():
+            error_count = len(types["Errores"])
+            csv_writer.writerow([neighborhood, types["1x1"], types["2x1"], types["2x2"], error_count])
+
+    return {
+        "file": csv_filepath,
+        "buildings": len(output_data),
+        "entries": entries_count_by_type,
+        "errors": {name: types["Errores"] for name, types in building_types_by_neighborhood.items() if types["Errores"]},
+    }
+
 
 class OBJECT_OT_generate_csv_report(bpy.types.Operator):
     bl_idname = "object.generate_csv_report"
@@ -8,129 +240,8 @@ class OBJECT_OT_generate_csv_report(bpy.types.Operator):
     bl_options = {'REGISTER', 'UNDO'}
 
     def execute(self, context):
-        # Funciones auxiliares
-        def expand_volume(container, expansion):
-            bbox_corners = [Vector(corner) for corner in container.bound_box]
-            min_corner = Vector([min(corner[i] for corner in bbox_corners) for i in range(3)])
-            max_corner = Vector([max(corner[i] for corner in bbox_corners) for i in range(3)])
-            expanded_min = min_corner - expansion
-            expanded_max = max_corner + expansion
-            return expanded_min, expanded_max
-
-        def is_point_inside_expanded_volume(expanded_min, expanded_max, point):
-            return all(expanded_min[i] <= point[i] <= expanded_max[i] for i in range(3))
-
-        def is_point_inside_volume(container, point, expansion=Vector((0.05, 0.05, 0.05))):
-            expanded_min, expanded_max = expand_volume(container, expansion)
-            inv_mat = container.matrix_world.inverted()
-            local_point = inv_mat @ point
-            return is_point_inside_expanded_volume(expanded_min, expanded_max, local_point)
-
-        def get_base_name(name):
-            return name.split(".")[0]
-
-        def get_type_from_name(entry_name):
-            collections_prefixes = ["CHS", "Walls", "Pubs", "Apts"]
-            entry_name_base = get_base_name(entry_name)
-            for collection_prefix in collections_prefixes:
-                for collection in bpy.data.collections:
-                    if collection.name.startswith(collection_prefix):
-                        for obj in collection.objects:
-                            obj_name_base = get_base_name(obj.name)
-                            if entry_name_base == obj_name_base:
-                                return collection_prefix
-            return "Desconocido"
-
-        # Obtener el gráfico de evaluación
-        depsgraph = bpy.context.evaluated_depsgraph_get()
-
-        # Inicializar contadores
-        entries_count_by_type = {"CHS": 0, "Walls": 0, "Pubs": 0, "Apts": 0}
-        building_types_by_neighborhood = {}
-        output_data = []
-
-        # Recorrer barrios y edificios
-        buildings = [obj for obj in bpy.data.collections["Buildings_Exp"].objects if obj.type == 'MESH']
-        for obj in bpy.data.objects:
-            if obj.name.startswith("R_BR_"):
-                neighborhood_name = obj.name[5:]
-                neighborhood_eval = obj.evaluated_get(depsgraph)
-
-                matching_buildings = []
-                building_types_by_neighborhood[neighborhood_name] = {"1x1": 0, "2x1": 0, "2x2": 0, "Errores": []}
-
-                for building in buildings:
-                    building_origin = building.matrix_world.translation
-                    success, location, normal, poly_index = neighborhood_eval.ray_cast(building_origin, Vector((0, 0, -1)))
-                    if not success:
-                        continue
-
-                    facades_collection = bpy.data.collections.get("Facades_Exp")
-                    if not facades_collection:
-                        continue
-
-                    facades_inside = [facade for facade in facades_collection.objects if facade.type == 'MESH' and is_point_inside_volume(building, facade.location)]
-                    entry_count = len(facades_inside)
-
-                    if entry_count == 4:
-                        building_types_by_neighborhood[neighborhood_name]["1x1"] += 1
-                    elif entry_count == 6:
-                        building_types_by_neighborhood[neighborhood_name]["2x1"] += 1
-                    elif entry_count == 8:
-                        building_types_by_neighborhood[neighborhood_name]["2x2"] += 1
-                    else:
-                        building_types_by_neighborhood[neighborhood_name]["Errores"].append(building.name)
-
-                    # Construir fila para el CSV
-                    building_row = [neighborhood_name, building.name]
-                    for facade in facades_inside:
-                        entry_type = get_type_from_name(facade.name)
-                        nomenclature = None
-                        letters_collection = bpy.data.collections.get("Letters_Exp")
-                        if letters_collection:
-                            for letter in letters_collection.objects:
-                                if letter.type == 'MESH' and is_point_inside_volume(facade, letter.location):
-                                    nomenclature = letter.name.split('.')[0]
-                                    break
-                        building_row.extend([entry_type, facade.name, nomenclature or "N/A"])
-                        if entry_type in entries_count_by_type:
-                            entries_count_by_type[entry_type] += 1
-
-                    # Rellenar columnas faltantes con "N/A"
-                    while len(building_row) < 34:  # Máximo de 10 entradas (3 columnas por entrada)
-                        building_row.extend(["N/A", "N/A", "N/A"])
-
-                    output_data.append(building_row)
-
-        # Escribir datos en archivo CSV
         csv_filepath = bpy.path.abspath(context.scene.export_csv_path + "reporte_entradas.csv")
-
-        with open(csv_filepath, mode='w', newline='', encoding='utf-8') as csvfile:
-            csv_writer = csv.writer(csvfile)
-
-            # Sección 1: Detalle de edificios y entradas
-            csv_writer.writerow(["Detalle de edificios y entradas"])
-            headers = ["Barrio", "Edificio"]
-            for i in range(1, 11):  # Máximo 10 entradas
-                headers.extend([f"Tipo {i}", f"Nombre {i}", f"Placa {i}"])
-            csv_writer.writerow(headers)
-            for row in output_data:
-                csv_writer.writerow(row)
-
-            # Sección 2: Reporte general de las entradas por tipo
-            csv_writer.writerow([])
-            csv_writer.writerow(["Reporte general de las entradas por tipo"])
-            csv_writer.writerow(["Tipo de Entrada", "Cantidad"])
-            for entry_type, count in entries_count_by_type.items():
-                csv_writer.writerow([entry_type, count])
-
-            # Sección 3: Reporte de edificios por barrios
-            csv_writer.writerow([])
-            csv_writer.writerow(["Reporte de edificios por barrios"])
-            csv_writer.writerow(["Barrio", "1x1", "2x1", "2x2", "Errores"])
-            for neighborhood, types in building_types_by_neighborhood.items():
-                error_count = len(types["Errores"])
-                csv_writer.writerow([neighborhood, types["1x1"], types["2x1"], types["2x2"], error_count])
+        write_csv_report(csv_filepath)
 
         self.report({'INFO'}, f"Archivo CSV generado: {csv_filepath}")
         return {'FINISHED'}
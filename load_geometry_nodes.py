@@ -1,268 +1,137 @@
 import bpy
+from bpy.props import EnumProperty
+
+from .node_library import get_node_group
+
+
+# Base común: el node group se resuelve con node_library (sin recargar el .blend en cada clic)
+class NodeToolMixin:
+    node_group_name = ""
+    # True: reutilizar el primer modificador NODES existente en vez de crear uno nuevo
+    reuse_modifier = False
+
+    target: EnumProperty(
+        name="Aplicar a",
+        items=[
+            ('ACTIVE', "Activo", "Solo el objeto activo"),
+            ('SELECTED', "Selección", "Todos los objetos Mesh seleccionados"),
+            ('COLLECTION', "Colección activa", "Todos los objetos Mesh de la colección activa"),
+        ],
+        default='ACTIVE',
+    )
+
+    def get_targets(self, context):
+        if self.target == 'COLLECTION':
+            objects = context.view_layer.active_layer_collection.collection.all_objects
+        elif self.target == 'SELECTED' and context.selected_objects:
+            objects = context.selected_objects
+        else:
+            objects = [context.object] if context.object else []
+        return [obj for obj in objects if obj.type == 'MESH']
+
+    def get_modifier(self, obj, node_group):
+        # Reutilizar un modificador que ya use este node group (evita apilar duplicados)
+        modifier = next((mod for mod in obj.modifiers if mod.type == 'NODES' and mod.node_group == node_group), None)
+        if modifier is None and self.reuse_modifier:
+            modifier = next((mod for mod in obj.modifiers if mod.type == 'NODES'), None)
+        if modifier is None:
+            modifier = obj.modifiers.new(name="GeometryNodes", type='NODES')
+        return modifier
+
+    def execute(self, context):
+        node_group_name = self.node_group_name
+
+        targets = self.get_targets(context)
+        if not targets:
+            self.report({'ERROR'}, "No hay un objeto seleccionado o el objeto no es de tipo Mesh")
+            return {'CANCELLED'}
+
+        # El node group se carga una sola vez para todo el lote
+        node_group, error = get_node_group(node_group_name)
+        if node_group is None:
+            self.report({'ERROR'}, error)
+            return {'CANCELLED'}
+
+        # El depsgraph evalúa una sola vez al terminar el operador, no por asignación
+        for obj in targets:
+            modifier = self.get_modifier(obj, node_group)
+            # Asignar el Geometry Node al objeto
+            modifier.node_group = node_group
+
+        if len(targets) == 1:
+            self.report({'INFO'}, f"Grupo de nodos '{node_group_name}' asignado a {targets[0].name}.")
+        else:
+            self.report({'INFO'}, f"Grupo de nodos '{node_group_name}' asignado a {len(targets)} objetos.")
+        return {'FINISHED'}
 
 # Operador para cargar Landmark_Plates
-class OBJECT_OT_load_landmark_plates(bpy.types.Operator):
+class OBJECT_OT_load_landmark_plates(NodeToolMixin, bpy.types.Operator):
     bl_idname = "object.load_landmark_plates"
     bl_label = "Landmark Facades"
     bl_description = "Genera fachadas segùn un edge de geometrìa en el orden de la colecciòn seleccionada"
     bl_options = {'REGISTER', 'UNDO'}
-    
-    def execute(self, context):
-        node_group_name = "Landmark_Plates"
-        node_group_path = "I:/Unidades compartidas/EDITABLES ALPHAVERSE/TOOLS/BlenderScripts/addons/map_settings_tools_AddOn/Map_basics.blend"
 
-        # Obtener el objeto activo
-        obj = context.object
-        if obj is None or obj.type != 'MESH':
-            self.report({'ERROR'}, "No hay un objeto seleccionado o el objeto no es de tipo Mesh")
-            return {'CANCELLED'}
-        
-        # Cargar el archivo .blend que contiene el grupo de nodos
-        with bpy.data.libraries.load(node_group_path, link=False) as (data_from, data_to):
-            if node_group_name in data_from.node_groups:
-                data_to.node_groups.append(node_group_name)
-            else:
-                self.report({'ERROR'}, f"El grupo de nodos '{node_group_name}' no se encontró en el archivo.")
-                return {'CANCELLED'}
-        
-        # Asignar el Geometry Node al objeto seleccionado
-        modifier = obj.modifiers.new(name="GeometryNodes", type='NODES')
-        modifier.node_group = bpy.data.node_groups[node_group_name]
-        
-        self.report({'INFO'}, f"Grupo de nodos '{node_group_name}' asignado a {obj.name}.")
-        return {'FINISHED'}
+    node_group_name = "Landmark_Plates"
 
 # Operador para cargar Multisnap
-class OBJECT_OT_load_multisnap(bpy.types.Operator):
+class OBJECT_OT_load_multisnap(NodeToolMixin, bpy.types.Operator):
     bl_idname = "object.load_multisnap"
     bl_label = "Z Snap"
     bl_description = "Hace snap en el eje 'Z' de instancias o vertices sobre una mesh seleccionada "
     bl_options = {'REGISTER', 'UNDO'}
-    
-    def execute(self, context):
-        node_group_name = "Multisnap"
-        node_group_path = "I:/Unidades compartidas/EDITABLES ALPHAVERSE/TOOLS/BlenderScripts/addons/map_settings_tools_AddOn/Map_basics.blend"
 
-        # Obtener el objeto activo
-        obj = context.object
-        if obj is None or obj.type != 'MESH':
-            self.report({'ERROR'}, "No hay un objeto seleccionado o el objeto no es de tipo Mesh")
-            return {'CANCELLED'}
-        
-        # Cargar el archivo .blend que contiene el grupo de nodos
-        with bpy.data.libraries.load(node_group_path, link=False) as (data_from, data_to):
-            if node_group_name in data_from.node_groups:
-                data_to.node_groups.append(node_group_name)
-            else:
-                self.report({'ERROR'}, f"El grupo de nodos '{node_group_name}' no se encontró en el archivo.")
-                return {'CANCELLED'}
-        
-        # Asignar el Geometry Node al objeto seleccionado
-        modifier = obj.modifiers.new(name="GeometryNodes", type='NODES')
-        modifier.node_group = bpy.data.node_groups[node_group_name]
-        
-        self.report({'INFO'}, f"Grupo de nodos '{node_group_name}' asignado a {obj.name}.")
-        return {'FINISHED'}
+    node_group_name = "Multisnap"
 
 # Operador para cargar Edge_distribution
-class OBJECT_OT_load_edge_distribution(bpy.types.Operator):
+class OBJECT_OT_load_edge_distribution(NodeToolMixin, bpy.types.Operator):
     bl_idname = "object.load_edge_distribution"
     bl_label = "Edge Distribution"
     bl_description = "Distribuye objetos en la linea definida por los vertices de la mesh"
     bl_options = {'REGISTER', 'UNDO'}
-    
-    def execute(self, context):
-        node_group_name = "Edge_distribution"
-        node_group_path = "I:/Unidades compartidas/EDITABLES ALPHAVERSE/TOOLS/BlenderScripts/addons/map_settings_tools_AddOn/Map_basics.blend"
-
-        # Obtener el objeto activo
-        obj = context.object
-        if obj is None or obj.type != 'MESH':
-            self.report({'ERROR'}, "No hay un objeto seleccionado o el objeto no es de tipo Mesh")
-            return {'CANCELLED'}
-        
-        # Cargar el archivo .blend que contiene el grupo de nodos
-        with bpy.data.libraries.load(node_group_path, link=False) as (data_from, data_to):
-            if node_group_name in data_from.node_groups:
-                data_to.node_groups.append(node_group_name)
-            else:
-                self.report({'ERROR'}, f"El grupo de nodos '{node_group_name}' no se encontró en el archivo.")
-                return {'CANCELLED'}
-        
-        # Asignar el Geometry Node al objeto seleccionado
-        modifier = obj.modifiers.new(name="GeometryNodes", type='NODES')
-        modifier.node_group = bpy.data.node_groups[node_group_name]
-        
-        self.report({'INFO'}, f"Grupo de nodos '{node_group_name}' asignado a {obj.name}.")
-        return {'FINISHED'}
 
+    node_group_name = "Edge_distribution"
 
 # Operador para cargar Area_distribution
-class OBJECT_OT_load_area_distribution(bpy.types.Operator):
+class OBJECT_OT_load_area_distribution(NodeToolMixin, bpy.types.Operator):
     bl_idname = "object.area_distribution"
     bl_label = "Area Distribution"
     bl_description = "Distribuye objetos de una colecciòn en el area definida por la mesh"
     bl_options = {'REGISTER', 'UNDO'}
-    
-    def execute(self, context):
-        node_group_name = "Area_Distribution"
-        node_group_path = "I:/Unidades compartidas/EDITABLES ALPHAVERSE/TOOLS/BlenderScripts/addons/map_settings_tools_AddOn/Map_basics.blend"
 
-        # Obtener el objeto activo
-        obj = context.object
-        if obj is None or obj.type != 'MESH':
-            self.report({'ERROR'}, "No hay un objeto seleccionado o el objeto no es de tipo Mesh")
-            return {'CANCELLED'}
-        
-        # Cargar el archivo .blend que contiene el grupo de nodos
-        with bpy.data.libraries.load(node_group_path, link=False) as (data_from, data_to):
-            if node_group_name in data_from.node_groups:
-                data_to.node_groups.append(node_group_name)
-            else:
-                self.report({'ERROR'}, f"El grupo de nodos '{node_group_name}' no se encontró en el archivo.")
-                return {'CANCELLED'}
-        
-        # Asignar el Geometry Node al objeto seleccionado
-        modifier = obj.modifiers.new(name="GeometryNodes", type='NODES')
-        modifier.node_group = bpy.data.node_groups[node_group_name]
-        
-        self.report({'INFO'}, f"Grupo de nodos '{node_group_name}' asignado a {obj.name}.")
-        return {'FINISHED'}
+    node_group_name = "Area_Distribution"
 
 # Operador para cargar PostWithFlags
-class OBJECT_OT_PostsWithFlags(bpy.types.Operator):
+class OBJECT_OT_PostsWithFlags(NodeToolMixin, bpy.types.Operator):
     bl_idname = "object.post_flags"
     bl_label = "Post flagged"
     bl_description = "Distribuye banderines entre vertices"
     bl_options = {'REGISTER', 'UNDO'}
-    
-    def execute(self, context):
-        node_group_name = "PostsWithFlags"
-        node_group_path = "I:/Unidades compartidas/EDITABLES ALPHAVERSE/TOOLS/BlenderScripts/addons/map_settings_tools_AddOn/Map_basics.blend"
 
-        # Obtener el objeto activo
-        obj = context.object
-        if obj is None or obj.type != 'MESH':
-            self.report({'ERROR'}, "No hay un objeto seleccionado o el objeto no es de tipo Mesh")
-            return {'CANCELLED'}
-        
-        # Cargar el archivo .blend que contiene el grupo de nodos
-        with bpy.data.libraries.load(node_group_path, link=False) as (data_from, data_to):
-            if node_group_name in data_from.node_groups:
-                data_to.node_groups.append(node_group_name)
-            else:
-                self.report({'ERROR'}, f"El grupo de nodos '{node_group_name}' no se encontró en el archivo.")
-                return {'CANCELLED'}
-        
-        # Asignar el Geometry Node al objeto seleccionado
-        modifier = obj.modifiers.new(name="GeometryNodes", type='NODES')
-        modifier.node_group = bpy.data.node_groups[node_group_name]
-        
-        self.report({'INFO'}, f"Grupo de nodos '{node_group_name}' asignado a {obj.name}.")
-        return {'FINISHED'}
+    node_group_name = "PostsWithFlags"
 
 # Operador para cargar PostWithFlags
-class OBJECT_OT_CleanNearest(bpy.types.Operator):
+class OBJECT_OT_CleanNearest(NodeToolMixin, bpy.types.Operator):
     bl_idname = "object.clean_nearest"
     bl_label = "Clean Nearest"
     bl_description = "Elimina instancias cercanas a una mesh definida"
     bl_options = {'REGISTER', 'UNDO'}
-    
-    def execute(self, context):
-        node_group_name = "CleanNearest"
-        node_group_path = "I:/Unidades compartidas/EDITABLES ALPHAVERSE/TOOLS/BlenderScripts/addons/map_settings_tools_AddOn/Map_basics.blend"
 
-        # Obtener el objeto activo
-        obj = context.object
-        if obj is None or obj.type != 'MESH':
-            self.report({'ERROR'}, "No hay un objeto seleccionado o el objeto no es de tipo Mesh")
-            return {'CANCELLED'}
-        
-        # Cargar el archivo .blend que contiene el grupo de nodos
-        with bpy.data.libraries.load(node_group_path, link=False) as (data_from, data_to):
-            if node_group_name in data_from.node_groups:
-                data_to.node_groups.append(node_group_name)
-            else:
-                self.report({'ERROR'}, f"El grupo de nodos '{node_group_name}' no se encontró en el archivo.")
-                return {'CANCELLED'}
-        
-        # Asignar el Geometry Node al objeto seleccionado
-        modifier = obj.modifiers.new(name="GeometryNodes", type='NODES')
-        modifier.node_group = bpy.data.node_groups[node_group_name]
-        
-        self.report({'INFO'}, f"Grupo de nodos '{node_group_name}' asignado a {obj.name}.")
-        return {'FINISHED'}
+    node_group_name = "CleanNearest"
 
 # Operador para cargar Road Paths
-class OBJECT_OT_RoadPaths(bpy.types.Operator):
+class OBJECT_OT_RoadPaths(NodeToolMixin, bpy.types.Operator):
     bl_idname = "object.road_paths"
     bl_label = "Road Paths"
     bl_description = "Crea caminos basados en una mesh low"
     bl_options = {'REGISTER', 'UNDO'}
-    
-    def execute(self, context):
-        node_group_name = "Road Paths"
-        node_group_path = "I:/Unidades compartidas/EDITABLES ALPHAVERSE/TOOLS/BlenderScripts/addons/map_settings_tools_AddOn/Map_basics.blend"
 
-        # Obtener el objeto activo
-        obj = context.object
-        if obj is None or obj.type != 'MESH':
-            self.report({'ERROR'}, "No hay un objeto seleccionado o el objeto no es de tipo Mesh")
-            return {'CANCELLED'}
-        
-        # Cargar el archivo .blend que contiene el grupo de nodos
-        with bpy.data.libraries.load(node_group_path, link=False) as (data_from, data_to):
-            if node_group_name in data_from.node_groups:
-                data_to.node_groups.append(node_group_name)
-            else:
-                self.report({'ERROR'}, f"El grupo de nodos '{node_group_name}' no se encontró en el archivo.")
-                return {'CANCELLED'}
-        
-        # Asignar el Geometry Node al objeto seleccionado
-        modifier = obj.modifiers.new(name="GeometryNodes", type='NODES')
-        modifier.node_group = bpy.data.node_groups[node_group_name]
-        
-        self.report({'INFO'}, f"Grupo de nodos '{node_group_name}' asignado a {obj.name}.")
-        return {'FINISHED'}
+    node_group_name = "Road Paths"
 
-class OBJECT_OT_FlatBorders(bpy.types.Operator):
+class OBJECT_OT_FlatBorders(NodeToolMixin, bpy.types.Operator):
     bl_idname = "object.flat_borders"
     bl_label = "Flat Borders"
     bl_description = "Crea caminos basados en una mesh low"
     bl_options = {'REGISTER', 'UNDO'}
-    
-    def execute(self, context):
-        node_group_name = "FlatBorders"
-        node_group_path = "I:/Unidades compartidas/EDITABLES ALPHAVERSE/TOOLS/BlenderScripts/addons/map_settings_tools_AddOn/Map_basics.blend"
-
-        # Obtener el objeto activo
-        obj = context.object
-        if obj is None or obj.type != 'MESH':
-            self.report({'ERROR'}, "No hay un objeto seleccionado o el objeto no es de tipo Mesh")
-            return {'CANCELLED'}
-        
-        # Cargar el archivo .blend que contiene el grupo de nodos
-        self.report({'INFO'}, "Cargando archivo .blend...")
-        with bpy.data.libraries.load(node_group_path, link=False) as (data_from, data_to):
-            if node_group_name in data_from.node_groups:
-                data_to.node_groups = [node_group_name]
-                self.report({'INFO'}, f"Grupo de nodos '{node_group_name}' cargado.")
-            else:
-                self.report({'ERROR'}, f"El grupo de nodos '{node_group_name}' no se encontró en el archivo.")
-                return {'CANCELLED'}
-        
-        # Verificar si ya hay un modificador de nodos
-        existing_modifier = next((mod for mod in obj.modifiers if mod.type == 'NODES'), None)
-        if existing_modifier:
-            modifier = existing_modifier
-        else:
-            modifier = obj.modifiers.new(name="GeometryNodes", type='NODES')
-        
-        # Asignar el Geometry Node al objeto seleccionado
-        modifier.node_group = bpy.data.node_groups[node_group_name]
-        
-        self.report({'INFO'}, f"Grupo de nodos '{node_group_name}' asignado a {obj.name}.")
-        return {'FINISHED'}
-
-
 
+    node_group_name = "FlatBorders"
+    reuse_modifier = True
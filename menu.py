@@ -1,5 +1,7 @@
 import bpy
 
+from . import sync_queue
+
 class VIEW3D_PT_map_setting_tools(bpy.types.Panel):
     bl_label = "Standard setting tools"
     bl_idname = "VIEW3D_PT_map_setting_tools"
@@ -79,6 +81,12 @@ class VIEW3D_PT_export_tools(bpy.types.Panel):
         layout = self.layout
 
         layout.prop(context.scene, "export_folder")
+        layout.prop(context.scene, "export_force")
+        row = layout.row(align=True)
+        row.prop(context.scene, "export_parallel")
+        sub = row.row(align=True)
+        sub.enabled = context.scene.export_parallel
+        sub.prop(context.scene, "export_workers")
         layout.operator("object.export_fbx", text="Export Collection FBX")
         layout.operator("object.buildings_export_fbx", text="Buildings Export FBX")
         layout.operator("object.import_fbx_to_collections", icon="IMPORT")
@@ -112,7 +120,11 @@ class VIEW3D_PT_procesar_mallas(bpy.types.Panel):
         if actualizar_props is not None:
             layout.prop(actualizar_props, "ruta_blend")
             layout.prop(actualizar_props, "nombre_coleccion")
+            row = layout.row()
+            row.prop(actualizar_props, "modo", expand=True)
+            row.prop(actualizar_props, "forzar")
             layout.operator("object.actualizar_coleccion_externa", icon="FILE_REFRESH")
+            sync_queue.draw_estado(layout)
         else:
             layout.label(text="(Actualizar FBX: props no disponibles)")
 
@@ -0,0 +1,84 @@
+import numpy as np
+from mathutils import Matrix
+
+
+# ==============================================================
+#   HORNEAR TRANSFORMACIONES EN LAS MALLAS
+# ==============================================================
+# Equivalente a transform_apply(location=True, rotation=True, scale=True)
+# sobre una lista de objetos, sin operadores: las coordenadas de cada malla
+# (y de sus shape keys) se multiplican de una vez con numpy (foreach_get /
+# foreach_set) y los objetos quedan sin padre y con la matriz identidad.
+
+def _transform_co(collection, matrix):
+    co = np.empty(len(collection) * 3, dtype=np.float32)
+    collection.foreach_get("co", co)
+    co = co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+    collection.foreach_set("co", co.astype(np.float32).ravel())
+
+
+def _corner_keys(mesh):
+    """Clave (cara, vértice) de cada esquina: sobrevive al reordenado de flip_normals."""
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int64)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    vertex_index = np.empty(len(mesh.loops), dtype=np.int64)
+    mesh.loops.foreach_get("vertex_index", vertex_index)
+    polygon_index = np.repeat(np.arange(len(loop_totals), dtype=np.int64), loop_totals)
+    return polygon_index * len(mesh.vertices) + vertex_index
+
+
+def _bake_mesh(mesh, matrix):
+    # Las normales personalizadas se leen antes de mover vértices: después
+    # Blender las expresaría ya respecto a la geometría transformada
+    normals = None
+    if mesh.has_custom_normals:
+        normals = np.empty(len(mesh.loops) * 3, dtype=np.float32)
+        mesh.corner_normals.foreach_get("vector", normals)
+        normals = normals.reshape(-1, 3)
+
+    _transform_co(mesh.vertices, matrix)
+    if mesh.shape_keys:
+        for key_block in mesh.shape_keys.key_blocks:
+            _transform_co(key_block.data, matrix)
+
+    # Espejo (determinante negativo): invertir el orden de las caras
+    if np.linalg.det(matrix[:3, :3]) < 0:
+        keys_before = _corner_keys(mesh)
+        mesh.flip_normals()
+        if normals is not None:
+            # Llevar cada normal a la esquina que ocupa ahora su (cara, vértice)
+            order = np.argsort(keys_before)
+            normals = normals[order[np.searchsorted(keys_before[order], _corner_keys(mesh))]]
+
+    if normals is not None:
+        normals = normals @ np.linalg.inv(matrix[:3, :3])
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        normals /= np.where(lengths > 0, lengths, 1.0)
+        mesh.normals_split_custom_set(normals)
+
+    mesh.update()
+
+
+def bake_world_transforms(objects):
+    """Hornea matrix_world en la malla de cada objeto y deja los objetos sin padre en el origen."""
+    objects = list(objects)
+
+    # Leer todas las matrices antes de tocar padres
+    matrices = [np.array(obj.matrix_world, dtype=np.float64) for obj in objects]
+
+    baked = set()
+    for obj, matrix in zip(objects, matrices):
+        if obj.type != 'MESH' or obj.data is None:
+            continue
+        # Malla compartida por varios objetos: cada uno necesita su copia
+        if obj.data.as_pointer() in baked:
+            obj.data = obj.data.copy()
+        baked.add(obj.data.as_pointer())
+        _bake_mesh(obj.data, matrix)
+
+    for obj, matrix in zip(objects, matrices):
+        obj.parent = None
+        if obj.type == 'MESH' and obj.data is not None:
+            obj.matrix_world = Matrix.Identity(4)
+        else:
+            obj.matrix_world = Matrix(matrix.tolist())
@@ -0,0 +1,80 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# ==============================================================
+#   NOMENCLATURA S_<prefijo>_<tipo>_...
+# ==============================================================
+# El prefijo y el tipo salen del nombre de la subcolección (<prefijo>_<tipo>).
+# Por cada par (prefijo, tipo) se compila una expresión regular que acepta
+# exactamente los nombres válidos; solo los nombres que no la cumplen pasan
+# por las comprobaciones detalladas que generan los mensajes de error.
+
+TIPOS_SIN_ENTRADA = ("Building", "Wall", "BLimit")
+TIPOS_CON_ENTRANCE = ("CH", "PUB", "APT")
+SUFIJOS = ("LOD1", "LOD2", "Coll")
+
+Violation = namedtuple("Violation", ("obj", "message"))
+
+# Segmento que no es solo un número (el número debe ir con una letra)
+_NO_SOLO_NUMERO = r"(?!\d+(?:_|$))[^_]*"
+_SUFIJO_FINAL = r"(?:(?:_[^_]*)*_(?:" + "|".join(SUFIJOS) + r"))?"
+
+
+@lru_cache(maxsize=None)
+def compile_rule(prefijo, tipo):
+    """Regex de nombre válido para una subcolección <prefijo>_<tipo>."""
+    cabecera = f"S_{re.escape(prefijo)}_{re.escape(tipo)}_"
+    if tipo in TIPOS_SIN_ENTRADA:
+        patron = cabecera + _NO_SOLO_NUMERO + _SUFIJO_FINAL
+    else:
+        tercero = "Entrance" if tipo in TIPOS_CON_ENTRANCE else "[^_]*"
+        patron = cabecera + tercero + "(?:_" + _NO_SOLO_NUMERO + _SUFIJO_FINAL + ")?"
+    return re.compile(patron)
+
+
+@lru_cache(maxsize=65536)
+def check_name(prefijo, tipo, nombre):
+    """Mensajes de error para un nombre (tupla vacía si es válido). Cacheado por nombre."""
+    if compile_rule(prefijo, tipo).fullmatch(nombre):
+        return ()
+
+    partes = nombre.split("_")
+    if len(partes) < 4:
+        return (f"Error en {nombre}: nombre incompleto.",)
+
+    errores = []
+    if partes[0] != "S":
+        errores.append(f"Error en {nombre}: debe iniciar con 'S'")
+
+    if partes[1] != prefijo:
+        errores.append(f"Error en {nombre}: el prefijo debe ser {prefijo}")
+
+    if partes[2] != tipo:
+        errores.append(f"Error en {nombre}: esto es '{tipo}', no '{partes[2]}'")
+
+    if tipo in TIPOS_CON_ENTRANCE and partes[3] != "Entrance":
+        errores.append(f"Error en {nombre}: debe ser 'Entrance' en _{partes[3]}_")
+
+    idx_numero = 3 if tipo in TIPOS_SIN_ENTRADA else 4
+    if len(partes) > idx_numero and partes[idx_numero].isdigit():
+        errores.append(f"Error en {nombre}: el número debe ir acompañado de una letra")
+
+    if len(partes) > idx_numero + 1 and partes[-1] not in SUFIJOS:
+        errores.append(f"Error en {nombre}: sufijo '{partes[-1]}' no permitido")
+
+    return tuple(errores)
+
+
+def split_collection_name(nombre_coleccion):
+    colpart = nombre_coleccion.split("_")
+    return colpart[0], colpart[1] if len(colpart) > 1 else ""
+
+
+def iter_violations(coleccion):
+    """Una sola pasada por las subcolecciones: produce Violation(obj, mensaje)."""
+    for subcoleccion in coleccion.children:
+        prefijo, tipo = split_collection_name(subcoleccion.name)
+        for obj in subcoleccion.objects:
+            for message in check_name(prefijo, tipo, obj.name):
+                yield Violation(obj, message)
@@ -0,0 +1,122 @@
+import bpy
+import os
+from bpy.props import StringProperty
+
+
+# ==============================================================
+#   RUTA DE LA LIBRERÍA DE NODOS
+# ==============================================================
+
+LIBRARY_FILENAME = "Map_basics.blend"
+LEGACY_LIBRARY_PATH = "I:/Unidades compartidas/EDITABLES ALPHAVERSE/TOOLS/BlenderScripts/addons/map_settings_tools_AddOn/Map_basics.blend"
+
+# Propiedad guardada en cada node group anexado: mtime del .blend de origen
+MTIME_KEY = "map_tools_library_mtime"
+
+_resolved_path = None
+# {ruta: (mtime, set de nombres de node groups)}
+_library_index = {}
+
+
+def _on_library_path_update(self, context):
+    clear_library_cache()
+
+
+class MapSettingToolsPreferences(bpy.types.AddonPreferences):
+    bl_idname = __package__
+
+    node_library_path: StringProperty(
+        name="Librería de nodos",
+        description="Archivo .blend con los Geometry Nodes (vacío = Map_basics.blend junto al addon)",
+        subtype='FILE_PATH',
+        update=_on_library_path_update,
+    )
+
+    def draw(self, context):
+        self.layout.prop(self, "node_library_path")
+
+
+def clear_library_cache():
+    global _resolved_path
+    _resolved_path = None
+    _library_index.clear()
+
+
+def resolve_library_path():
+    """Preferencias del addon → Map_basics.blend junto al addon → ruta compartida antigua."""
+    global _resolved_path
+    if _resolved_path:
+        return _resolved_path
+
+    candidates = []
+    addon = bpy.context.preferences.addons.get(__package__)
+    if addon and addon.preferences and addon.preferences.node_library_path:
+        candidates.append(bpy.path.abspath(addon.preferences.node_library_path))
+    candidates.append(os.path.join(os.path.dirname(__file__), LIBRARY_FILENAME))
+    candidates.append(LEGACY_LIBRARY_PATH)
+
+    for path in candidates:
+        if os.path.exists(path):
+            _resolved_path = path
+            return path
+    return None
+
+
+def _library_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def available_node_groups(path, mtime):
+    """Nombres de node groups del .blend; solo se vuelve a leer si cambió su mtime."""
+    cached = _library_index.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with bpy.data.libraries.load(path, link=False) as (data_from, data_to):
+        names = set(data_from.node_groups)
+    _library_index[path] = (mtime, names)
+    return names
+
+
+# ==============================================================
+#   OBTENER / ANEXAR NODE GROUPS
+# ==============================================================
+
+def get_node_group(node_group_name):
+    """
+    Devuelve (node_group, error). Reutiliza el grupo ya anexado si el archivo
+    de origen no cambió desde entonces; si cambió, lo vuelve a anexar y
+    reemplaza el anterior (sin crear duplicados .001).
+    """
+    existing = bpy.data.node_groups.get(node_group_name)
+    path = resolve_library_path()
+
+    if path is None:
+        if existing:
+            return existing, None
+        return None, f"No se encontró la librería de nodos '{LIBRARY_FILENAME}'."
+
+    mtime = _library_mtime(path)
+    if existing and (mtime is None or existing.get(MTIME_KEY, mtime) >= mtime):
+        return existing, None
+    if mtime is None:
+        return None, f"No se pudo leer la librería de nodos: {path}"
+
+    if node_group_name not in available_node_groups(path, mtime):
+        return None, f"El grupo de nodos '{node_group_name}' no se encontró en el archivo."
+
+    with bpy.data.libraries.load(path, link=False) as (data_from, data_to):
+        data_to.node_groups = [node_group_name]
+
+    node_group = data_to.node_groups[0]
+    node_group[MTIME_KEY] = mtime
+
+    if existing:
+        # Versión nueva en la librería: reemplazar usos y conservar el nombre
+        existing.user_remap(node_group)
+        bpy.data.node_groups.remove(existing)
+        node_group.name = node_group_name
+
+    return node_group, None
@@ -4,41 +4,21 @@ import math
 import mathutils
 from mathutils import Vector
 
-def clean_duplicates(collection, tolerance=0.01):
-    unique_positions = {}
-    for obj in collection.objects:
-        position = obj.location
-        frozen_position = position.copy()
-        frozen_position.freeze()
-        found_duplicate = False
-        
-        for existing_pos, existing_obj in unique_positions.items():
-            distance = (position - existing_pos).length
-            if distance <= tolerance:
-                bpy.data.objects.remove(obj, do_unlink=True)
-                found_duplicate = True
-                break
-        
-        if not found_duplicate:
-            unique_positions[frozen_position] = obj
-
-def expand_volume(container, expansion):
-    """Expandir el volumen del contenedor añadiendo un margen de expansión"""
-    bbox_corners = [Vector(corner) for corner in container.bound_box]
-    min_corner = Vector([min(corner[i] for corner in bbox_corners) for i in range(3)])
-    max_corner = Vector([max(corner[i] for corner in bbox_corners) for i in range(3)])
-    expanded_min = min_corner - expansion
-    expanded_max = max_corner + expansion
-    return expanded_min, expanded_max
+from . import containment
+from .spatial_index import SpatialGrid
 
-def is_point_inside_expanded_volume(expanded_min, expanded_max, point):
-    return all(expanded_min[i] <= point[i] <= expanded_max[i] for i in range(3))
+def clean_duplicates(collection, tolerance=0.01):
+    # Índice incremental con las posiciones ya conservadas
+    unique_positions = SpatialGrid(cell_size=max(tolerance * 4, 1e-4))
+    for obj in list(collection.objects):
+        if unique_positions.query_radius(obj.location, tolerance):
+            bpy.data.objects.remove(obj, do_unlink=True)
+        else:
+            unique_positions.insert(obj)
 
 def is_point_inside_volume(container, point, expansion=Vector((0.01, 0.01, 0.01))):
-    expanded_min, expanded_max = expand_volume(container, expansion)
-    inv_mat = container.matrix_world.inverted()
-    local_point = inv_mat @ point
-    return is_point_inside_expanded_volume(expanded_min, expanded_max, local_point)
+    # bound_box local e inversa cacheados por objeto (ver containment.py)
+    return containment.is_point_inside(container, point, expansion)
 
 def clean_objects():
     facades_collection = bpy.data.collections.get("Facades_Exp")
@@ -73,18 +53,20 @@ def clean_objects():
         print("No se encontraron fachadas coincidentes.")
         return
 
+    plates_grid = SpatialGrid(p for p in plates_collection.objects if p.type == 'MESH')
+    letters_grid = SpatialGrid(l for l in letters_collection.objects if l.type == 'FONT')
+
     plates_to_remove = set()
     letters_to_remove = set()
     
     for facade in facades_to_check:
         # Usar el pivote de la fachada para verificar las placas dentro del área
-        plates_inside = [p for p in plates_collection.objects if p.type == 'MESH' and is_point_inside_volume(facade, p.location)]
+        plates_inside = plates_grid.query_volume(facade)
         for plate in plates_inside:
             plates_to_remove.add(plate)
             
             # Encontrar letras dentro de cada placa
-            letters_inside = [l for l in letters_collection.objects if l.type == 'FONT' and is_point_inside_volume(plate, l.location)]
-            letters_to_remove.update(letters_inside)
+            letters_to_remove.update(letters_grid.query_volume(plate))
     
     # Eliminar las placas y letras encontradas
     for plate in plates_to_remove:
@@ -96,19 +78,19 @@ def clean_objects():
     print(f"Placas y letras eliminadas. {len(plates_to_remove)} placas y {len(letters_to_remove)} letras.")
 
 
-def find_building_number(building, numbers_collection):
-    for obj in numbers_collection.objects:
-        if obj.type == 'FONT' and is_point_inside_volume(building, obj.location):
-            match = re.match(r'(\d+)', obj.name)
-            if match:
-                return match.group(1)
+def find_building_number(building, numbers_grid):
+    """numbers_grid: SpatialGrid con los textos (FONT) de Numbers_Exp."""
+    for obj in numbers_grid.query_volume(building):
+        match = re.match(r'(\d+)', obj.name)
+        if match:
+            return match.group(1)
     return None
 
-def find_letter_A_in_building(building, letters_collection):
-    for letter in letters_collection.objects:
-        if letter.type == 'FONT' and is_point_inside_volume(building, letter.location):
-            if letter.data.body.startswith("A"):
-                return letter
+def find_letter_A_in_building(building, letters_grid):
+    """letters_grid: SpatialGrid con los objetos de Letters_Exp."""
+    for letter in letters_grid.query_volume(building):
+        if letter.type == 'FONT' and letter.data.body.startswith("A"):
+            return letter
     return None
 
 def calculate_midpoint(objects):
@@ -208,29 +190,35 @@ class OBJECT_OT_rename_plates(bpy.types.Operator):
             
             clean_duplicates(letters_collection)
             print("Duplicates cleaned")
+
+            # Índices espaciales construidos una sola vez por ejecución
+            numbers_grid = SpatialGrid(o for o in numbers_collection.objects if o.type == 'FONT')
+            facades_grid = SpatialGrid(facades_collection.objects)
+            plates_grid = SpatialGrid(plates_collection.objects)
+            letters_grid = SpatialGrid(letters_collection.objects)
             
             for building in buildings_collection.objects:
                 if building.type != 'MESH':
                     continue
                 
-                Ned = find_building_number(building, numbers_collection)
+                Ned = find_building_number(building, numbers_grid)
                 if not Ned:
                     continue
                 
-                facades_inside = [entry for entry in facades_collection.objects if is_point_inside_volume(building, entry.location)]
+                facades_inside = facades_grid.query_volume(building)
                 if not facades_inside:
                     self.report({'WARNING'}, f"No se encontraron entradas dentro del edificio: {building.name}")
                     continue
                 
-                plates_inside = [plate for entry in facades_inside for plate in plates_collection.objects if is_point_inside_volume(entry, plate.location)]
+                plates_inside = [plate for entry in facades_inside for plate in plates_grid.query_volume(entry)]
                 if not plates_inside:
                     self.report({'WARNING'}, f"No se encontraron placas dentro de las entradas en el edificio: {building.name}")
                     continue
                 
-                letters_inside = [letter for plate in plates_inside for letter in letters_collection.objects if is_point_inside_volume(plate, letter.location)]
+                letters_inside = [letter for plate in plates_inside for letter in letters_grid.query_volume(plate)]
                 
                 if not letters_inside:
-                    letter_A = find_letter_A_in_building(building, letters_collection)
+                    letter_A = find_letter_A_in_building(building, letters_grid)
                     if not letter_A:
                         self.report({'WARNING'}, f"No se encontró la letra 'A' dentro del edificio: {building.name}")
                         continue
@@ -250,8 +238,11 @@ class OBJECT_OT_rename_plates(bpy.types.Operator):
                     letter.name = new_name
                     duplicated_obj = update_text_content(letter)
                     duplicated_letters.append(duplicated_obj)
+                    if letters_collection in duplicated_obj.users_collection:
+                        letters_grid.insert(duplicated_obj)
                 
                 for letter in sorted_letters:
+                    letters_grid.discard(letter)
                     bpy.data.objects.remove(letter, do_unlink=True)
             
             clean_objects()
@@ -0,0 +1,120 @@
+import math
+
+from . import containment
+
+
+# ==============================================================
+#   REJILLA UNIFORME (XY)
+# ==============================================================
+
+class SpatialGrid:
+    """
+    Índice espacial de objetos por su location, en una rejilla uniforme XY.
+    Se construye una vez por ejecución y responde consultas por caja
+    (query_aabb) o por volumen de un contenedor (query_volume) sin recorrer
+    toda la colección. Los resultados conservan el orden de inserción,
+    igual que iterar collection.objects.
+    """
+
+    def __init__(self, objects=(), cell_size=None):
+        objects = list(objects)
+        self.cell_size = cell_size or self._auto_cell_size(objects)
+        self._cells = {}
+        self._entries = {}
+        self._next_index = 0
+        for obj in objects:
+            self.insert(obj)
+
+    @staticmethod
+    def _auto_cell_size(objects):
+        if len(objects) < 2:
+            return 1.0
+        xs = [o.location.x for o in objects]
+        ys = [o.location.y for o in objects]
+        extent = max(max(xs) - min(xs), max(ys) - min(ys))
+        # ~1 objeto por celda si estuvieran repartidos uniformemente
+        size = extent / math.sqrt(len(objects))
+        return size if size > 1e-6 else 1.0
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def insert(self, obj):
+        key = obj.as_pointer()
+        if key in self._entries:
+            return
+        location = obj.location[:]
+        cell = self._cell(location[0], location[1])
+        self._entries[key] = (self._next_index, obj, location, cell)
+        self._cells.setdefault(cell, []).append(key)
+        self._next_index += 1
+
+    def discard(self, obj):
+        """Quita el objeto del índice (llamar ANTES de bpy.data.objects.remove)."""
+        key = obj.as_pointer()
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        bucket = self._cells.get(entry[3])
+        if bucket:
+            bucket.remove(key)
+            if not bucket:
+                del self._cells[entry[3]]
+
+    def _query(self, mn, mx):
+        x0, y0 = self._cell(mn[0], mn[1])
+        x1, y1 = self._cell(mx[0], mx[1])
+
+        # Si la caja cubre más celdas de las ocupadas, recorrer solo las ocupadas
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self._cells):
+            buckets = [
+                keys for (cx, cy), keys in self._cells.items()
+                if x0 <= cx <= x1 and y0 <= cy <= y1
+            ]
+        else:
+            buckets = [
+                self._cells[(cx, cy)]
+                for cx in range(x0, x1 + 1)
+                for cy in range(y0, y1 + 1)
+                if (cx, cy) in self._cells
+            ]
+
+        found = []
+        for keys in buckets:
+            for key in keys:
+                index, obj, p, _cell = self._entries[key]
+                if all(mn[i] <= p[i] <= mx[i] for i in range(3)):
+                    found.append((index, obj, p))
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def query_aabb(self, mn, mx):
+        """Objetos cuya location está dentro de la caja [mn, mx] (espacio mundo)."""
+        return [obj for _index, obj, _p in self._query(mn, mx)]
+
+    def query_volume(self, container, expansion=0.01, local=True):
+        """
+        Objetos dentro del volumen del contenedor.
+        local=True  -> bound_box local expandido (criterio de rename_plates / csv report)
+        local=False -> AABB en mundo expandido (criterio de apply_fullbuilding_sys)
+        """
+        bounds = containment.get_bounds(container)
+        mn, mx = bounds.world_box(expansion, local)
+        candidates = self._query(mn, mx)
+        if not local or not candidates:
+            return [obj for _index, obj, _p in candidates]
+
+        mask = containment.points_inside(container, [p for _index, _obj, p in candidates], expansion)
+        return [obj for (_index, obj, _p), inside in zip(candidates, mask) if inside]
+
+    def query_radius(self, point, radius):
+        """Objetos a distancia <= radius del punto."""
+        mn = [point[i] - radius for i in range(3)]
+        mx = [point[i] + radius for i in range(3)]
+        return [
+            obj for _index, obj, p in self._query(mn, mx)
+            if math.dist(p, point[:3]) <= radius
+        ]
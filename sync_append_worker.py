@@ -0,0 +1,240 @@
+# Worker de sincronización directa (sin FBX) para "blender --background".
+#
+#   blender --background --factory-startup [destino.blend] --python sync_append_worker.py -- \
+#       --source fuente.blend --collection NOMBRE [--collection "BR_*" ...] --target destino.blend
+#
+# En un solo proceso: abre el destino (o parte de un archivo vacío si no
+# existe), anexa de una vez todas las colecciones pedidas (nombres o
+# patrones tipo "BR_*") desde el .blend fuente con bpy.data.libraries.load,
+# las deja como las dejaba el viaje por FBX y guarda una sola vez.
+#
+# Equivalencia con exportar FBX (-Z adelante, Y arriba, bake_space_transform,
+# FBX_SCALE_NONE) e importarlo con los ejes por defecto + transform_apply:
+# la conversión de ejes de la exportación y la de la importación se anulan,
+# así que el resultado es la malla evaluada (modificadores aplicados) en
+# coordenadas de mundo, sin padre y con la matriz identidad. Eso es lo que
+# se hace aquí, pero sin perder datos de la malla (normales, UVs, atributos).
+#
+# Antes de anexar, las colecciones se enlazan (link) y se evalúan para
+# calcular el hash de su geometría final; las que coinciden con el registro
+# del destino (sync_ledger) no se tocan. --force reemplaza todas.
+
+import argparse
+import importlib
+import os
+import sys
+from fnmatch import fnmatchcase
+
+import bpy
+from mathutils import Matrix
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(ADDON_DIR))
+sync_ledger = importlib.import_module(os.path.basename(ADDON_DIR) + ".sync_ledger")
+
+COLECCION_PADRE = "Blocking"
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="sync_append_worker")
+    parser.add_argument("--source", required=True)
+    parser.add_argument("--collection", action="append", required=True, help="Nombre o patrón (repetible)")
+    parser.add_argument("--target", required=True)
+    parser.add_argument("--force", action="store_true", help="Reemplazar aunque la geometría no haya cambiado")
+    return parser.parse_args(argv)
+
+
+def quitar_coleccion(nombre):
+    """Si existe la colección, eliminarla completamente (como el import por FBX)."""
+    col = bpy.data.collections.get(nombre)
+    if col is None:
+        return
+    for obj in list(col.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+    bpy.data.collections.remove(col)
+
+
+def resolver_nombres(nombres_fuente, patrones):
+    """
+    Colecciones de la fuente que coinciden con algún nombre o patrón, en el
+    orden de la fuente. Devuelve (nombres, patrones sin coincidencias).
+    """
+    nombres = [n for n in nombres_fuente if any(fnmatchcase(n, p) for p in patrones)]
+    sin_coincidencias = [p for p in patrones if not any(fnmatchcase(n, p) for n in nombres_fuente)]
+    return nombres, sin_coincidencias
+
+
+def nombres_en_fuente(ruta_blend, patrones):
+    # Leer los nombres de la fuente no carga nada
+    with bpy.data.libraries.load(ruta_blend, link=False) as (data_from, _data_to):
+        return resolver_nombres(list(data_from.collections), patrones)
+
+
+def hashes_en_fuente(ruta_blend, nombres):
+    """
+    Enlaza las colecciones (sin copiarlas) y las evalúa en la escena para
+    calcular el hash de la geometría que se sincronizaría.
+    """
+    with bpy.data.libraries.load(ruta_blend, link=True) as (_data_from, data_to):
+        data_to.collections = nombres
+    enlazadas = [col for col in data_to.collections if col is not None]
+
+    escena = bpy.context.scene.collection
+    for col in enlazadas:
+        escena.children.link(col)
+
+    hashes = {}
+    try:
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        for col in enlazadas:
+            hashes[col.name] = sync_ledger.geometry_hash(col, depsgraph)
+    finally:
+        for col in enlazadas:
+            escena.children.unlink(col)
+        if enlazadas:
+            bpy.data.libraries.remove(enlazadas[0].library)
+    return hashes
+
+
+def anexar_colecciones(ruta_blend, nombres):
+    # Quitar las versiones anteriores antes de anexar, para que colecciones
+    # y objetos conserven sus nombres sin sufijos .001
+    for nombre in nombres:
+        quitar_coleccion(nombre)
+
+    with bpy.data.libraries.load(ruta_blend, link=False) as (_data_from, data_to):
+        data_to.collections = nombres
+    return [col for col in data_to.collections if col is not None]
+
+
+def coleccion_padre():
+    parent_col = bpy.data.collections.get(COLECCION_PADRE)
+    if parent_col is None:
+        parent_col = bpy.data.collections.new(COLECCION_PADRE)
+        bpy.context.scene.collection.children.link(parent_col)
+    return parent_col
+
+
+def dejar_solo_mallas(col, pedidas):
+    """
+    El FBX solo llevaba las mallas directas de la colección: quitar el resto.
+    Las subcolecciones que también se han pedido se separan y se conservan.
+    """
+    mallas = [obj for obj in col.objects if obj.type == 'MESH']
+    conservar = {obj.as_pointer() for obj in mallas}
+    for otra in pedidas:
+        if otra != col:
+            conservar.update(obj.as_pointer() for obj in otra.all_objects)
+
+    punteros_pedidos = {otra.as_pointer() for otra in pedidas}
+    for obj in list(col.all_objects):
+        if obj.as_pointer() not in conservar:
+            bpy.data.objects.remove(obj, do_unlink=True)
+    for child in list(col.children):
+        if child.as_pointer() in punteros_pedidos:
+            col.children.unlink(child)
+    for child in list(col.children_recursive):
+        if child.as_pointer() not in punteros_pedidos:
+            bpy.data.collections.remove(child)
+    return mallas
+
+
+def evaluar_mallas(mallas):
+    """
+    Malla evaluada (modificadores aplicados) y matrix_world de cada objeto.
+    Se hace antes de podar: los cortadores de booleanos, las curvas y empties
+    que usan Geometry Nodes o Array y los padres aún están en la escena.
+    """
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    evaluadas = []
+    for obj in mallas:
+        mesh = bpy.data.meshes.new_from_object(
+            obj.evaluated_get(depsgraph), preserve_all_data_layers=True, depsgraph=depsgraph
+        )
+        evaluadas.append((obj, mesh, obj.matrix_world.copy()))
+    return evaluadas
+
+
+def hornear_mallas(evaluadas):
+    """Modificadores aplicados, sin padre y transformaciones horneadas en la malla."""
+    # Malla de origen -> mallas horneadas que la sustituyen (varias si estaba compartida)
+    originales = {}
+    for obj, mesh, matrix_world in evaluadas:
+        originales.setdefault(obj.data.as_pointer(), (obj.data, []))[1].append(mesh)
+        obj.modifiers.clear()
+        obj.parent = None
+        obj.data = mesh
+
+        mesh.transform(matrix_world)
+        if matrix_world.determinant() < 0:
+            mesh.flip_normals()
+        obj.matrix_world = Matrix.Identity(4)
+
+    # Borrar y renombrar una vez por malla de origen, cuando ya nadie la usa,
+    # para que la primera malla horneada recupere el nombre exacto
+    for original, mallas in originales.values():
+        nombre = original.name
+        if original.users == 0:
+            bpy.data.meshes.remove(original)
+        for mesh in mallas:
+            mesh.name = nombre
+
+
+def guardar(target):
+    if bpy.data.filepath and os.path.samefile(bpy.data.filepath, target):
+        bpy.ops.wm.save_mainfile()
+    else:
+        bpy.ops.wm.save_as_mainfile(filepath=target)
+
+
+def main():
+    args = parse_args()
+
+    nombres, sin_coincidencias = nombres_en_fuente(args.source, args.collection)
+    for patron in sin_coincidencias:
+        print(f"AVISO: '{patron}' no coincide con ninguna colección de {args.source}")
+    if not nombres:
+        print("ERROR: ninguna colección encontrada")
+        sys.exit(1)
+
+    # Saltar las colecciones cuya geometría no cambió desde la última sincronización
+    ledger = sync_ledger.read_ledger()
+    mtime = sync_ledger.source_mtime(args.source)
+    hashes = hashes_en_fuente(args.source, nombres)
+    cambiadas = []
+    for nombre in nombres:
+        if not args.force and sync_ledger.same_geometry(ledger, nombre, args.source, hashes.get(nombre)):
+            print(f"SIN CAMBIOS: '{nombre}'")
+        else:
+            cambiadas.append(nombre)
+        sync_ledger.record_sync(ledger, nombre, args.source, mtime, hashes.get(nombre))
+
+    colecciones = anexar_colecciones(args.source, cambiadas) if cambiadas else []
+
+    parent_col = coleccion_padre()
+    for col in colecciones:
+        parent_col.children.link(col)
+
+    # Evaluar todo antes de quitar nada (un objeto puede estar en varias colecciones)
+    mallas_por_col = [(col, [obj for obj in col.objects if obj.type == 'MESH']) for col in colecciones]
+    unicas = {obj.as_pointer(): obj for _col, mallas in mallas_por_col for obj in mallas}
+    evaluadas = evaluar_mallas(list(unicas.values()))
+
+    for col, mallas in mallas_por_col:
+        dejar_solo_mallas(col, colecciones)
+        if not mallas:
+            print(f"AVISO: colección '{col.name}' sin mallas")
+        else:
+            print(f"OK: '{col.name}' ({len(mallas)} mallas)")
+
+    hornear_mallas(evaluadas)
+    total = len(evaluadas)
+
+    # Se guarda aunque no cambie nada: el mtime nuevo deja la próxima comprobación en milisegundos
+    sync_ledger.write_ledger(ledger)
+    guardar(args.target)
+    print(f"OK: {len(colecciones)} colecciones sincronizadas ({total} mallas), {len(nombres) - len(cambiadas)} sin cambios")
+
+
+main()
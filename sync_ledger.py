@@ -0,0 +1,118 @@
+import bpy
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from .export_manifest import hash_mesh
+
+# ==============================================================
+#   REGISTRO DE SINCRONIZACIONES (dentro del .blend destino)
+# ==============================================================
+# Un bloque de texto del archivo Blocking guarda, por colección, de qué
+# archivo fuente vino, el mtime de ese archivo y un hash de la geometría.
+# - Si el archivo fuente no se ha guardado desde la última sincronización
+#   (mismo mtime), la colección se salta sin lanzar ningún Blender: el
+#   registro se lee desde el Cutter con libraries.load, en milisegundos.
+# - Si el archivo cambió, el worker compara el hash de la geometría evaluada
+#   de cada colección (lo que acabaría en el destino) y solo reemplaza las
+#   que cambiaron de verdad.
+
+LEDGER_TEXT = "MapTools_SyncLedger"
+LEDGER_VERSION = 1
+
+
+def _vacio():
+    return {"version": LEDGER_VERSION, "colecciones": {}}
+
+
+def _parse(contenido):
+    try:
+        ledger = json.loads(contenido)
+    except ValueError:
+        return _vacio()
+    if ledger.get("version") != LEDGER_VERSION:
+        return _vacio()
+    return ledger
+
+
+def read_ledger():
+    """Registro del archivo abierto (vacío si no hay)."""
+    text = bpy.data.texts.get(LEDGER_TEXT)
+    return _parse(text.as_string()) if text else _vacio()
+
+
+def write_ledger(ledger):
+    text = bpy.data.texts.get(LEDGER_TEXT) or bpy.data.texts.new(LEDGER_TEXT)
+    text.use_fake_user = True
+    text.from_string(json.dumps(ledger, indent=2, sort_keys=True))
+
+
+def read_ledger_from_file(blend_path):
+    """Lee el registro de otro .blend sin abrirlo (anexa el texto y lo borra)."""
+    if not os.path.exists(blend_path):
+        return _vacio()
+
+    with bpy.data.libraries.load(blend_path, link=False) as (data_from, data_to):
+        if LEDGER_TEXT not in data_from.texts:
+            return _vacio()
+        data_to.texts = [LEDGER_TEXT]
+
+    text = data_to.texts[0]
+    if text is None:
+        return _vacio()
+    try:
+        return _parse(text.as_string())
+    finally:
+        bpy.data.texts.remove(text)
+
+
+def source_mtime(source_path):
+    return os.path.getmtime(source_path)
+
+
+def _misma_fuente(entry, source_path):
+    return os.path.normcase(os.path.abspath(entry.get("fuente", ""))) == os.path.normcase(os.path.abspath(source_path))
+
+
+def is_unchanged(ledger, nombre, source_path, mtime):
+    """Comprobación rápida: la fuente no se ha guardado desde la última sincronización."""
+    entry = ledger["colecciones"].get(nombre)
+    return bool(entry) and _misma_fuente(entry, source_path) and entry.get("mtime") == mtime
+
+
+def same_geometry(ledger, nombre, source_path, digest):
+    entry = ledger["colecciones"].get(nombre)
+    return bool(entry) and _misma_fuente(entry, source_path) and entry.get("hash") == digest
+
+
+def geometry_hash(coleccion, depsgraph):
+    """
+    Hash de las mallas directas de la colección tal como se sincronizan:
+    evaluadas (node trees y modificadores aplicados), con todos sus atributos,
+    matrix_world y nombres de materiales.
+    """
+    h = hashlib.sha1()
+    mallas = sorted((obj for obj in coleccion.objects if obj.type == 'MESH'), key=lambda o: o.name)
+    for obj in mallas:
+        obj_eval = obj.evaluated_get(depsgraph)
+        h.update(obj.name.encode())
+        h.update(np.array(obj_eval.matrix_world, dtype=np.float32).tobytes())
+        h.update(repr([slot.material.name if slot.material else "" for slot in obj_eval.material_slots]).encode())
+        mesh = obj_eval.to_mesh(preserve_all_data_layers=True, depsgraph=depsgraph)
+        try:
+            hash_mesh(h, mesh)
+        finally:
+            obj_eval.to_mesh_clear()
+    return h.hexdigest()
+
+
+def record_sync(ledger, nombre, source_path, mtime, digest=None):
+    ledger["colecciones"][nombre] = {
+        "fuente": os.path.abspath(source_path),
+        "mtime": mtime,
+        "hash": digest,
+        "sincronizado": time.time(),
+    }
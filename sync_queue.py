@@ -0,0 +1,281 @@
+import bpy
+import os
+import queue
+import shutil
+import subprocess
+import threading
+from bpy.app.handlers import persistent
+from collections import deque
+
+
+# ==============================================================
+#   SINCRONIZACIÓN EN SEGUNDO PLANO
+# ==============================================================
+# Cada sincronización es una lista de etapas (un proceso de Blender por
+# etapa) que se lanzan con subprocess.Popen. Un operador modal con timer
+# comprueba los procesos sin bloquear la interfaz, pasa su salida al log
+# del panel y arranca la siguiente etapa. Varias sincronizaciones corren a
+# la vez, salvo las que escriben el mismo archivo destino, que esperan turno.
+
+LOG_LINES = 200
+
+# Últimas líneas de salida de los procesos (para el panel)
+_log = deque(maxlen=LOG_LINES)
+_jobs = []
+_runner_activo = False
+
+
+def _leer_salida(stream, lines):
+    # Hilo lector: un PIPE que nadie lee acaba bloqueando al proceso hijo
+    for line in iter(stream.readline, ""):
+        lines.put(line.rstrip())
+    stream.close()
+
+
+class SyncJob:
+    def __init__(self, coleccion, target_blend, etapas, temp_dir=None):
+        self.coleccion = coleccion
+        self.target_blend = target_blend
+        self.etapas = etapas
+        self.temp_dir = temp_dir
+        self.indice = -1
+        self.proc = None
+        self.lector = None
+        self.lines = queue.Queue()
+        self.estado = 'PENDIENTE'
+        self.error = None
+
+    @property
+    def etapa_actual(self):
+        return self.etapas[self.indice][0] if 0 <= self.indice < len(self.etapas) else ""
+
+    @property
+    def terminado(self):
+        return self.estado in {'OK', 'ERROR', 'CANCELADO'}
+
+    def _start_stage(self):
+        self.indice += 1
+        _nombre, cmd = self.etapas[self.indice]
+        self.proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+        self.lector = threading.Thread(target=_leer_salida, args=(self.proc.stdout, self.lines), daemon=True)
+        self.lector.start()
+
+    def start(self):
+        self.estado = 'EJECUTANDO'
+        try:
+            self._start_stage()
+        except OSError as e:
+            self._finish('ERROR', f"no se pudo lanzar Blender: {e}")
+
+    def drain(self):
+        """Líneas nuevas de salida (sin esperar)."""
+        while True:
+            try:
+                yield self.lines.get_nowait()
+            except queue.Empty:
+                return
+
+    def poll(self):
+        """Avanza el trabajo; devuelve True cuando ha terminado."""
+        if self.terminado:
+            return True
+        if self.proc.poll() is None:
+            return False
+
+        # Esperar a que el lector vacíe el PIPE antes de pasar de etapa
+        self.lector.join(timeout=1.0)
+        if self.proc.returncode != 0:
+            self._finish('ERROR', f"falló la etapa '{self.etapa_actual}' (código {self.proc.returncode})")
+        elif self.indice + 1 < len(self.etapas):
+            self._start_stage()
+            return False
+        else:
+            self._finish('OK')
+        return True
+
+    def cancel(self):
+        if self.terminado:
+            return
+        if self.proc and self.proc.poll() is None:
+            self.proc.kill()
+            self.proc.wait()
+        self._finish('CANCELADO', "cancelado")
+
+    def _finish(self, estado, error=None):
+        self.estado = estado
+        self.error = error
+        if self.temp_dir:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+def _destinos_ocupados():
+    return {os.path.normcase(job.target_blend) for job in _jobs if job.estado == 'EJECUTANDO'}
+
+
+def jobs_activos():
+    return [job for job in _jobs if not job.terminado]
+
+
+def en_curso(coleccion, target_blend):
+    target = os.path.normcase(target_blend)
+    return any(job.coleccion == coleccion and os.path.normcase(job.target_blend) == target for job in jobs_activos())
+
+
+def encolar(job):
+    """Añade la sincronización y arranca el operador modal si no está activo."""
+    _jobs.append(job)
+    _log.append(f"[{job.coleccion}] en cola → {job.target_blend}")
+    if not _runner_activo:
+        bpy.ops.object.sincronizacion_externa_modal('INVOKE_DEFAULT')
+
+
+def cancelar_todo():
+    for job in jobs_activos():
+        job.cancel()
+        _log.append(f"[{job.coleccion}] ✖ cancelado")
+
+
+def _volcar_salida(job):
+    for line in job.drain():
+        print(f"[{job.coleccion}] {line}")
+        _log.append(f"[{job.coleccion}] {line}")
+
+
+def _step():
+    ocupados = _destinos_ocupados()
+    for job in _jobs:
+        if job.estado == 'PENDIENTE':
+            target = os.path.normcase(job.target_blend)
+            # Dos procesos guardando el mismo .blend se pisarían: esperar turno
+            if target in ocupados:
+                continue
+            ocupados.add(target)
+            job.start()
+            if job.terminado:
+                _log.append(f"[{job.coleccion}] ✖ {job.error}")
+                continue
+            _log.append(f"[{job.coleccion}] {job.etapa_actual} (1/{len(job.etapas)})")
+
+        if job.estado == 'EJECUTANDO':
+            _volcar_salida(job)
+            indice = job.indice
+            terminado = job.poll()
+            # poll() espera al lector: la última salida (y la traza de error) llega ahora
+            _volcar_salida(job)
+            if terminado:
+                _log.append(f"[{job.coleccion}] {'✔ terminado' if job.estado == 'OK' else '✖ ' + job.error}")
+            elif job.indice != indice:
+                _log.append(f"[{job.coleccion}] {job.etapa_actual} ({job.indice + 1}/{len(job.etapas)})")
+
+
+# ==============================================================
+#   HANDLERS
+# ==============================================================
+
+@persistent
+def _on_load_pre(*args):
+    # Al abrir otro archivo el operador modal muere sin pasar por finish()
+    global _runner_activo
+    cancelar_todo()
+    _jobs.clear()
+    _runner_activo = False
+
+
+def register_handlers():
+    if _on_load_pre not in bpy.app.handlers.load_pre:
+        bpy.app.handlers.load_pre.append(_on_load_pre)
+
+
+def unregister_handlers():
+    if _on_load_pre in bpy.app.handlers.load_pre:
+        bpy.app.handlers.load_pre.remove(_on_load_pre)
+
+
+def draw_estado(layout):
+    """Progreso por sincronización y últimas líneas del log (para el panel)."""
+    activos = jobs_activos()
+    if activos:
+        box = layout.box()
+        for job in activos:
+            if job.estado == 'PENDIENTE':
+                box.label(text=f"{job.coleccion}: en espera", icon='TIME')
+            else:
+                box.label(text=f"{job.coleccion}: {job.etapa_actual} ({job.indice + 1}/{len(job.etapas)})", icon='SORTTIME')
+        box.operator("object.cancelar_sincronizacion_externa", icon='CANCEL')
+
+    if _log:
+        box = layout.box()
+        for line in list(_log)[-8:]:
+            box.label(text=line)
+
+
+class OBJECT_OT_sincronizacion_externa_modal(bpy.types.Operator):
+    bl_idname = "object.sincronizacion_externa_modal"
+    bl_label = "Sincronización externa"
+    bl_description = "Procesa las sincronizaciones en segundo plano sin bloquear la interfaz"
+
+    _timer = None
+
+    def invoke(self, context, event):
+        global _runner_activo
+        _runner_activo = True
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.2, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        _step()
+
+        activos = jobs_activos()
+        if activos:
+            estado = ", ".join(f"{job.coleccion}: {job.etapa_actual or 'en espera'}" for job in activos)
+            context.workspace.status_text_set(f"Sincronizando {estado}")
+        self._redraw(context)
+
+        if not activos:
+            return self.finish(context)
+        return {'PASS_THROUGH'}
+
+    def _redraw(self, context):
+        for area in context.screen.areas if context.screen else ():
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+
+    def finish(self, context):
+        global _runner_activo
+        _runner_activo = False
+        context.window_manager.event_timer_remove(self._timer)
+        context.workspace.status_text_set(None)
+
+        terminados = list(_jobs)
+        _jobs.clear()
+        errores = [job for job in terminados if job.estado == 'ERROR']
+        cancelados = [job for job in terminados if job.estado == 'CANCELADO']
+        if errores:
+            self.report({'ERROR'}, "; ".join(f"{job.coleccion}: {job.error}" for job in errores))
+        elif cancelados:
+            self.report({'WARNING'}, f"{len(cancelados)} sincronizaciones canceladas")
+        else:
+            self.report({'INFO'}, f"{len(terminados)} colecciones actualizadas correctamente")
+        return {'FINISHED'}
+
+
+class OBJECT_OT_cancelar_sincronizacion_externa(bpy.types.Operator):
+    bl_idname = "object.cancelar_sincronizacion_externa"
+    bl_label = "Cancelar sincronización"
+    bl_description = "Detiene los procesos de sincronización en curso"
+
+    def execute(self, context):
+        cancelar_todo()
+        return {'FINISHED'}